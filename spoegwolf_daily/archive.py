@@ -0,0 +1,77 @@
+# spoegwolf_daily/archive.py
+"""
+Lifecycle for finished events.
+
+Once an event is more than ARCHIVE_GRACE_DAYS (default 7) past its date, its final totals
+and group split are frozen into <SNAP_DIR>/archive/<key>.json, which the nightly workflow
+commits with the snapshots. From then on nothing fetches it: cron_snapshot and watch skip
+it, and the daily summary renders it from the record (SUMMARY_ARCHIVED=hide leaves it out).
+Delete the file to bring an event back.
+"""
+from __future__ import annotations
+import os, json
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+import pytz
+
+from .config import CFG
+from .snapshot_store import _dir
+
+# block fields that hold the group split, per source
+GROUP_FIELDS = {"plankton": ("ga", "kids", "goue"), "quicket": ("ga", "kids", "goue"), "itickets": ("normal", "vip")}
+
+
+def _path(key: str) -> str:
+    return os.path.join(_dir(), "archive", f"{key}.json")
+
+def grace_days() -> int:
+    try:
+        return int(CFG.get("ARCHIVE_GRACE_DAYS") or 7)
+    except ValueError:
+        return 7
+
+def is_finished(days_to_event: Optional[int]) -> bool:
+    return days_to_event is not None and days_to_event < -grace_days()
+
+def hide_archived() -> bool:
+    return (CFG.get("SUMMARY_ARCHIVED") or "show").strip().lower() == "hide"
+
+def load_archive(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def archive_event(key: str, source: str, name: str, capacity: int, total: int,
+                  groups: Dict[str, int], days_to_event: int, tz: str) -> Dict[str, Any]:
+    """Freeze the final figures; returns the record."""
+    now = datetime.now(pytz.timezone(tz))
+    rec = {
+        "key": key, "source": source, "name": name, "capacity": int(capacity), "total": int(total),
+        "groups": {g: int(n) for g, n in groups.items()},
+        "event_date": (now.date() + timedelta(days=days_to_event)).isoformat(),
+        "archived_at": now.isoformat(timespec="seconds"),
+    }
+    p = _path(key)
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = p + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(rec, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, p)
+    print(f"[archive][{source}] {name}: show was {rec['event_date']}; final total {total} frozen, no more fetches")
+    return rec
+
+def archive_block(key: str, source: str, block: Dict[str, Any], tz: str) -> Dict[str, Any]:
+    """Archive from a freshly fetched summary block."""
+    groups = {g: block.get(g, 0) for g in GROUP_FIELDS[source]}
+    return archive_event(key, source, block["name"], block.get("capacity", 0), block["total"],
+                         groups, block["days_to_event"], tz)
+
+def archived_block(rec: Dict[str, Any], ev: Dict[str, Any]) -> Dict[str, Any]:
+    """A summary block for build_message from an archive record (the configured name wins)."""
+    block = {g: 0 for g in GROUP_FIELDS.get(rec.get("source"), ())}
+    block.update(rec.get("groups") or {})
+    block.update(name=ev.get("name") or rec["name"], capacity=int(ev.get("capacity") or rec.get("capacity") or 0),
+                 total=int(rec["total"]), archived=rec["event_date"])
+    return block
@@ -0,0 +1,230 @@
+# spoegwolf_daily/bench.py
+"""
+Micro-benchmarks for the pure, CPU-bound parts: aggregation and rendering, no I/O.
+
+  python -m spoegwolf_daily.bench                  # compare against the stored baseline
+  python -m spoegwolf_daily.bench --save           # (re)write the baseline on this machine
+  python -m spoegwolf_daily.bench --quick --only quicket.summarize_guests
+
+Row benchmarks run at 1k … 1M rows, rendering ones at 1 … 500 shows. Each point is the
+best of BENCH_REPEAT (default 5) timed samples, each long enough (≥ 10 ms) to be measurable.
+A point is a regression when its time per row/show is more than BENCH_TOLERANCE (default
+0.25 = 25 %) above the baseline on a second, longer measurement too; the exit code is 1 then. Baselines are per machine: save
+them on the box that runs the comparison. Inputs are a few thousand synthetic rows
+(tools/memcheck's feeds) repeated to size, so memory stays small even at 1M.
+"""
+from __future__ import annotations
+import os, io, gc, csv, json, time, argparse, platform
+from typing import Dict, Any, List, Callable, Tuple
+
+BASELINE = os.getenv("BENCH_BASELINE", "data/bench_baseline.json")
+ROW_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+SHOW_SIZES = (1, 10, 100, 500)
+QUICK_ROWS = (1_000, 10_000, 100_000)
+QUICK_SHOWS = (1, 10, 100)
+_DISTINCT = 4096  # distinct synthetic rows; bigger sizes repeat them
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def _repeat(items: List[Any], n: int) -> List[Any]:
+    return [items[i % len(items)] for i in range(n)]
+
+# -------------------- inputs --------------------
+
+def _itickets_rows(n: int) -> List[Dict[str, str]]:
+    from .tools.memcheck import _csv
+    return _repeat(list(csv.DictReader(io.StringIO(_csv(_DISTINCT).decode()))), n)
+
+def _guests(n: int) -> List[Dict[str, Any]]:
+    from .tools.memcheck import _guest
+    return _repeat([_guest(i) for i in range(_DISTINCT)], n)
+
+def _orders(n: int) -> List[Dict[str, Any]]:
+    from .tools.memcheck import _order
+    orders = [_order(i) for i in range(_DISTINCT)]
+    for i, o in enumerate(orders):
+        if i % 5 == 0:  # some orders without a subtotal field: the line-item fallback
+            for k in ("current_subtotal_price", "subtotal_price", "total_line_items_price"):
+                o.pop(k)
+        o["line_items"][0]["title"] = f"Item {i % 40}"
+    return _repeat(orders, n)
+
+def _ticket_info(n: int) -> List[Dict[str, Any]]:
+    return [{"ticketName": f"Phase {i % 50}", "ticketsIssued": i % 17} for i in range(n)]
+
+def _blocks(n: int) -> Dict[str, Any]:
+    """build_message kwargs with n shows spread over the three sources."""
+    def base(i):
+        return {"name": f"Show {i}", "capacity": 2000, "total": 900 + i, "yesterday": i % 30,
+                "yesterday_groups": {"ga": i % 20, "kids": i % 10}, "week": [i % 90, i % 70],
+                "days_to_event": 30 + i}
+    shows = [dict(base(i), ga=700, kids=150, goue=50 + i) for i in range(0, n, 3)]
+    quicket = [dict(base(i), ga=800, kids=100 + i, goue=0) for i in range(1, n, 3)]
+    itickets = [dict(base(i), normal=850, vip=50 + i) for i in range(2, n, 3)]
+    shop = {"windows": [{"label": "Gister", "sales": 1234.5}, {"label": "Laaste 7 dae", "sales": 9876.0}],
+            "top_items": [{"title": "T-Shirt", "qty": 12}, {"title": "Cap", "qty": 7}]}
+    return {"shows_blocks": shows, "tz": "Africa/Johannesburg", "shopify": shop,
+            "quicket": quicket or None, "itickets": itickets or None}
+
+# -------------------- benchmarks --------------------
+# name -> (sizes, quick sizes, unit, setup(n) -> zero-arg callable)
+
+def _benchmarks() -> Dict[str, Tuple[Tuple[int, ...], Tuple[int, ...], str, Callable[[int], Callable[[], Any]]]]:
+    from .data_sources.itickets import summarize_itickets_total
+    from .data_sources.quicket import summarize_guests
+    from .data_sources.shopify import _pick_top_item, _sum_order_subtotal
+    from .main import _sum_by_names
+    from .summarize_af import build_message
+    from .senders.emailer import _text_to_html
+
+    groups = {"Adults": ["Fase Een", "Fase Twee"], "Kids": ["Kids Under 13"], "exclude": ["Complimentary"]}
+    wanted = ["Phase 1", "Phase 2", "Phase 3", "Phase 4", "Early Bird"]
+
+    def itickets(n):
+        rows = _itickets_rows(n)
+        return lambda: summarize_itickets_total(rows)
+
+    def quicket(n):
+        guests = _guests(n)
+        return lambda: summarize_guests(iter(guests), groups)
+
+    def sum_by_names(n):
+        tinfo = _ticket_info(n)
+        return lambda: _sum_by_names(tinfo, wanted)
+
+    def top_item(n):
+        orders = _orders(n)
+        return lambda: _pick_top_item(orders)
+
+    def subtotal(n):
+        orders = _orders(n)
+        return lambda: sum(_sum_order_subtotal(o) for o in orders)
+
+    def message(n):
+        kw = _blocks(n)
+        return lambda: build_message(**kw)
+
+    def html(n):
+        text = build_message(**_blocks(n))
+        return lambda: _text_to_html(text)
+
+    rows, shows = (ROW_SIZES, QUICK_ROWS, "row"), (SHOW_SIZES, QUICK_SHOWS, "show")
+    return {
+        "itickets.summarize_itickets_total": (*rows, itickets),
+        "quicket.summarize_guests": (*rows, quicket),
+        "main._sum_by_names": (*rows, sum_by_names),
+        "shopify._pick_top_item": (*rows, top_item),
+        "shopify._sum_order_subtotal": (*rows, subtotal),
+        "summarize_af.build_message": (*shows, message),
+        "emailer._text_to_html": (*shows, html),
+    }
+
+def measure(fn: Callable[[], Any], repeat: int) -> float:
+    """Best seconds per call over `repeat` samples of ≥ 10 ms each (timeit-style autorange, GC off)."""
+    gc_was_on = gc.isenabled()
+    gc.disable()
+    try:
+        return _measure(fn, repeat)
+    finally:
+        if gc_was_on:
+            gc.enable()
+
+def _measure(fn: Callable[[], Any], repeat: int) -> float:
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= 0.01:
+            break
+        number *= 10 if elapsed < 0.001 else 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best
+
+def _load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("results", {})
+    except (OSError, ValueError):
+        return {}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Micro-benchmarks for aggregation and rendering")
+    ap.add_argument("--only", action="append", help="only these benchmarks (repeatable)")
+    ap.add_argument("--quick", action="store_true", help="stop at 100k rows / 100 shows")
+    ap.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    ap.add_argument("--baseline", default=BASELINE, help=f"baseline file (default {BASELINE})")
+    ap.add_argument("--json", help="also write the results here")
+    args = ap.parse_args(argv)
+
+    benches = _benchmarks()
+    wanted = args.only or list(benches)
+    unknown = [b for b in wanted if b not in benches]
+    if unknown:
+        raise SystemExit(f"Unknown benchmark(s): {', '.join(unknown)} (have {', '.join(benches)})")
+    repeat = max(1, int(_env_float("BENCH_REPEAT", 5)))
+    tolerance = _env_float("BENCH_TOLERANCE", 0.25)
+    baseline = {} if args.save else _load_baseline(args.baseline)
+
+    results: Dict[str, Dict[str, float]] = {}
+    regressions = []
+    for name in wanted:
+        sizes, quick, unit, setup = benches[name]
+        for n in (quick if args.quick else sizes):
+            fn = setup(n)
+            secs = measure(fn, repeat)
+            base = baseline.get(name, {}).get(str(n))
+            if base and secs > base * (1 + tolerance):  # confirm before calling it a regression
+                secs = min(secs, measure(fn, repeat * 2))
+            results.setdefault(name, {})[str(n)] = secs
+            per = secs / n * 1e9
+            line = f"[bench] {name:<36} {n:>9,} {unit}s  {secs * 1e3:10.3f} ms  {per:9.1f} ns/{unit}"
+            if base:
+                ratio = secs / base
+                bad = ratio > 1 + tolerance
+                line += f"  x{ratio:5.2f} vs baseline{'  REGRESSION' if bad else ''}"
+                if bad:
+                    regressions.append(f"{name}@{n}")
+            print(line)
+        pts = sorted(results[name].items(), key=lambda kv: int(kv[0]))
+        if len(pts) > 1:
+            (n0, t0), (n1, t1) = pts[0], pts[-1]
+            print(f"[bench] {name:<36} scaling {n0}→{n1}: time x{t1 / t0:,.0f} for size x{int(n1) // int(n0):,}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+    if args.save:
+        d = os.path.dirname(args.baseline)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        merged = _load_baseline(args.baseline)
+        merged.update(results)
+        meta = {"python": platform.python_version(), "machine": platform.machine(),
+                "saved_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": merged}, f, indent=1, sort_keys=True)
+        print(f"[bench] baseline written to {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"[bench] no baseline at {args.baseline}; run with --save first")
+        return 0
+    if regressions:
+        print(f"[bench] slower than baseline by more than {tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"[bench] within {tolerance:.0%} of baseline")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
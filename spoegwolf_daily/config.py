@@ -1,4 +1,6 @@
-import os
+import os, json, contextvars
+from contextlib import contextmanager
+from collections.abc import MutableMapping, MutableSequence
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,6 +12,19 @@ CFG = {
     # Shopify
     "SHOPIFY_BASE": os.getenv("SHOPIFY_BASE"),
     "SHOPIFY_ACCESS_TOKEN": os.getenv("SHOPIFY_ACCESS_TOKEN"),
+    # Windows shown in the summary: yesterday, 7d, 30d, mtd, ytd (comma-separated)
+    "SHOPIFY_WINDOWS": os.getenv("SHOPIFY_WINDOWS", "yesterday,7d"),
+    "SHOPIFY_TOP_N": os.getenv("SHOPIFY_TOP_N", "1"),
+    # Add a "Hierdie week vs verlede week" line per show (1 = on)
+    "SUMMARY_WEEK_LINE": os.getenv("SUMMARY_WEEK_LINE", "0"),
+    # Keep purchase-time histograms up to date on each snapshot run (see sales_timing.py),
+    # and add a "Meeste verkope: Dinsdae, 19:00–20:00" line per Quicket/iTickets show (1 = on)
+    "SALES_TIMING": os.getenv("SALES_TIMING", "0"),
+    "SUMMARY_TIMING_LINE": os.getenv("SUMMARY_TIMING_LINE", "0"),
+    # Days after the show before an event is archived and no longer fetched (see archive.py);
+    # archived events are shown with their final figures, or left out with "hide"
+    "ARCHIVE_GRACE_DAYS": os.getenv("ARCHIVE_GRACE_DAYS", "7"),
+    "SUMMARY_ARCHIVED": os.getenv("SUMMARY_ARCHIVED", "show"),
     #GMAIL
     "EMAIL_HOST": os.getenv("EMAIL_HOST", "smtp.gmail.com"),
     "EMAIL_PORT": os.getenv("EMAIL_PORT", "465"),
@@ -19,6 +34,8 @@ CFG = {
         # --- Quicket ---
     "QUICKET_API_KEY": os.getenv("QUICKET_API_KEY"),
     "QUICKET_USERTOKEN": os.getenv("QUICKET_USERTOKEN"),
+    # Email subject prefix: "<REPORT_TITLE> Daaglikse Opsomming — ..."
+    "REPORT_TITLE": os.getenv("REPORT_TITLE", "Spoegwolf"),
 }
 
 # You’ll manually maintain this list (like SHOWS)
@@ -114,4 +131,120 @@ ITICKETS_EVENTS = [
     #     "event_date_date": "2027-08-10",
     #     "feed_url_env": "ITICKETS_FEED_OYS",  # GitHub secret name (full URL)
     # }
-]
\ No newline at end of file
+]
+
+# -------------------- tenants --------------------
+# Everything above is the default tenant. TENANTS_FILE (JSON) can list more acts, each with
+# its own credentials, events, recipients and snapshot namespace:
+#
+#   [{"name": "spoegwolf", "namespace": ""},            # "" = the existing data/ layout
+#    {"name": "act2", "env_prefix": "ACT2_",            # ACT2_QUICKET_API_KEY, ACT2_EMAIL_TO, ...
+#     "cfg": {"REPORT_TITLE": "Act Two"},
+#     "shows": [...], "quicket_events": [...], "itickets_events": [...]}]
+#
+# Code keeps using CFG / SHOWS / QUICKET_EVENTS / ITICKETS_EVENTS; they resolve to the tenant
+# active in the current context (see use_tenant), so tenants can run side by side in threads.
+
+
+# Credentials and recipients: a tenant with an env_prefix only ever gets its own (prefixed env
+# or its "cfg"); missing ones stay empty, so that tenant fails instead of using the default's.
+TENANT_PRIVATE = ("PLANKTON_AUTH", "PLANKTON_COOKIE", "SHOPIFY_BASE", "SHOPIFY_ACCESS_TOKEN",
+                  "QUICKET_API_KEY", "QUICKET_USERTOKEN", "EMAIL_USER", "EMAIL_PASS", "EMAIL_TO")
+
+
+class Tenant:
+    def __init__(self, name, cfg, shows, quicket_events, itickets_events, namespace=""):
+        self.name = name
+        self.cfg = cfg
+        self.shows = shows
+        self.quicket_events = quicket_events
+        self.itickets_events = itickets_events
+        self.namespace = namespace
+
+    def __repr__(self):
+        return f"Tenant({self.name!r})"
+
+
+DEFAULT_TENANT = Tenant("default", CFG, SHOWS, QUICKET_EVENTS, ITICKETS_EVENTS)
+_ACTIVE = contextvars.ContextVar("spoegwolf_tenant", default=None)
+
+def current_tenant() -> Tenant:
+    return _ACTIVE.get() or DEFAULT_TENANT
+
+@contextmanager
+def use_tenant(tenant: Tenant):
+    token = _ACTIVE.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _ACTIVE.reset(token)
+
+def namespaced(root: str) -> str:
+    """root, or root/<namespace> for a tenant with its own namespace."""
+    ns = current_tenant().namespace
+    return os.path.join(root, ns) if ns else root
+
+def load_tenants(path=None):
+    """Tenants from TENANTS_FILE; [DEFAULT_TENANT] when there is none."""
+    path = path or os.getenv("TENANTS_FILE")
+    if not path:
+        return [DEFAULT_TENANT]
+    with open(path, "r", encoding="utf-8") as f:
+        specs = json.load(f)
+    tenants = []
+    for spec in specs:
+        name = spec["name"]
+        prefix = spec.get("env_prefix", "")
+        cfg = dict(DEFAULT_TENANT.cfg)
+        if prefix:
+            for k in cfg:
+                if os.getenv(prefix + k) is not None:
+                    cfg[k] = os.getenv(prefix + k)
+                elif k in TENANT_PRIVATE:
+                    cfg[k] = None  # never another act's account or recipients
+        cfg.update(spec.get("cfg") or {})
+        tenants.append(Tenant(
+            name, cfg,
+            spec.get("shows", DEFAULT_TENANT.shows if not prefix else []),
+            spec.get("quicket_events", DEFAULT_TENANT.quicket_events if not prefix else []),
+            spec.get("itickets_events", DEFAULT_TENANT.itickets_events if not prefix else []),
+            namespace=spec.get("namespace", name),
+        ))
+    return tenants
+
+
+class _CfgView(MutableMapping):
+    def __getitem__(self, k):
+        return current_tenant().cfg[k]
+    def __setitem__(self, k, v):
+        current_tenant().cfg[k] = v
+    def __delitem__(self, k):
+        del current_tenant().cfg[k]
+    def __iter__(self):
+        return iter(current_tenant().cfg)
+    def __len__(self):
+        return len(current_tenant().cfg)
+
+class _ListView(MutableSequence):
+    def __init__(self, attr):
+        self._attr = attr
+    def _list(self):
+        return getattr(current_tenant(), self._attr)
+    def __getitem__(self, i):
+        return self._list()[i]
+    def __setitem__(self, i, v):
+        self._list()[i] = v
+    def __delitem__(self, i):
+        del self._list()[i]
+    def __len__(self):
+        return len(self._list())
+    def insert(self, i, v):
+        self._list().insert(i, v)
+    def __repr__(self):
+        return repr(self._list())
+
+
+CFG = _CfgView()
+SHOWS = _ListView("shows")
+QUICKET_EVENTS = _ListView("quicket_events")
+ITICKETS_EVENTS = _ListView("itickets_events")
@@ -1,11 +1,19 @@
 from .config import CFG, SHOWS, QUICKET_EVENTS, ITICKETS_EVENTS
 from .data_sources.plankton import get_event_summary
-from .snapshot_store import save_snapshot
+from .snapshot_store import save_snapshot, load_snapshots
 from .data_sources.quicket import summarize_event as quicket_summarize  # <-- add
-from .data_sources.itickets import fetch_itickets_csv_via_curl, summarize_itickets_total
-import os
+from .data_sources.quicket import get_event_date_first_page
+from .data_sources.itickets import fetch_itickets_text_via_curl, summarize_itickets_text
+from . import preflight, sales_timing
+from .archive import load_archive, archive_event, is_finished
+from .main import _days_to, _days_to_event_from_eventdate
+from .scheduler import run_queue
+from .snapshot_store import _dir
+from .config import namespaced
+import os, json, time
+from typing import Dict, Any, Optional
 
-from datetime import datetime
+from datetime import datetime, date, timedelta
 import pytz
 
 def _norm(s: str) -> str:
@@ -20,12 +28,142 @@ def _sum_by_names(ticket_info, wanted_names):
             total += int(t.get("ticketsIssued") or 0)
     return total
 
-def run():
+def _archived(source: str, key: str, name: str) -> bool:
+    if load_archive(key) is None:
+        return False
+    print(f"[snapshot][{source}] {name} archived; skipped")
+    return True
+
+def _quicket_days_to(ev, tz_name: str):
+    # override date if configured, else one first-page probe
+    if ev.get("event_date_date"):
+        return _days_to(datetime.strptime(ev["event_date_date"], "%Y-%m-%d").date(), tz_name)
+    return _days_to(get_event_date_first_page(int(ev["id"]), tz_name), tz_name)
+
+# -------------------- checkpoint --------------------
+# <SNAP_DIR>/.checkpoint.json exists only while a run is unfinished: {"day": "YYYY-MM-DD",
+# "started_at": epoch, "done": [keys]}. A complete run deletes it, so the nightly commit only
+# carries it (a few hundred bytes) when a rerun on a fresh runner has something to resume.
+# Event dates learned along the way (for ordering later runs) are derived state and live in
+# data/cache/nightly/event_dates.json, which the workflow keeps with actions/cache.
+
+DATES_DIR = os.path.join(os.getenv("CACHE_DIR", "data/cache"), "nightly")
+
+def _checkpoint_path() -> str:
+    return os.path.join(_dir(), ".checkpoint.json")
+
+def _load_checkpoint() -> Dict[str, Any]:
+    try:
+        with open(_checkpoint_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_checkpoint(cp: Dict[str, Any]):
+    p = _checkpoint_path()
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = p + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cp, f, indent=1, sort_keys=True)
+    os.replace(tmp, p)
+
+def _clear_checkpoint():
+    try:
+        os.remove(_checkpoint_path())
+    except FileNotFoundError:
+        pass
+
+def _dates_path() -> str:
+    return os.path.join(namespaced(DATES_DIR), "event_dates.json")
+
+def _load_dates() -> Dict[str, str]:
+    try:
+        with open(_dates_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_dates(dates: Dict[str, str]):
+    p = _dates_path()
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = p + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dates, f, indent=1, sort_keys=True)
+    os.replace(tmp, p)
+
+def _resume_hours() -> float:
+    try:
+        return float(os.getenv("SNAPSHOT_RESUME_HOURS", "4"))
+    except ValueError:
+        return 4.0
+
+def _resumable(cp: Dict[str, Any]) -> bool:
+    """An unfinished run recent enough that its day label still holds."""
+    return bool(cp.get("day")) and \
+        time.time() - float(cp.get("started_at") or 0) < _resume_hours() * 3600
+
+def _priority(key: str, ev: Dict[str, Any], dates: Dict[str, str], today: date):
+    """Soonest show first, then events with no known date, then shows already past."""
+    d = ev.get("event_date_date") or dates.get(key)
+    if not d:
+        return (1, 0)
+    days = (date.fromisoformat(d) - today).days
+    return (0, days) if days >= 0 else (2, -days)
+
+# -------------------- run --------------------
+
+def run(write: bool = True, budget: Optional[float] = None, fresh: bool = False, resume_only: bool = False):
+    """
+    Snapshot every configured event through one job queue (scheduler.run_queue): soonest show
+    first, FETCH_WORKERS at once, SOURCE_CONCURRENCY_<SOURCE> per API. Finished jobs are
+    checkpointed, so a rerun after a crash or an exhausted --budget picks up where this one
+    stopped (same day label) instead of starting over.
+    """
     tz = pytz.timezone(CFG["TZ"])
-    today_str = datetime.now(tz).date().isoformat()
+    save = save_snapshot if write else (lambda key, day, total, groups=None: load_snapshots(key).get(day) != total)
+    today = datetime.now(tz).date()
+    cp = _load_checkpoint() if write else {}
+    if write and not fresh and _resumable(cp):
+        print(f"[snapshot] resuming the {cp['day']} run: {len(cp.get('done') or [])} event(s) already done")
+    elif resume_only:
+        print("[snapshot] nothing to resume")
+        return 0
+    else:
+        cp = {"day": today.isoformat(), "started_at": time.time(), "done": []}
+    dates = _load_dates() if write else {}
+    today_str = cp["day"]
+    done = set(cp["done"])
+
+    # Bad credentials or a missing feed URL skip that source/event up front instead of failing
+    # midway; the rest is still snapshotted and the run exits non-zero at the end.
+    problems = preflight.check()
+    skipped = []
+
+    def blocked(source, key, name):
+        if not preflight.blocked(problems, key, source):
+            return False
+        print(f"[snapshot][{source}] {name} skipped (preflight: {problems.get(key) or problems[source]})")
+        skipped.append(name)
+        return True
 
-    # --- PLANKTON (unchanged) ---
-    for show in SHOWS:
+    # Past their date + ARCHIVE_GRACE_DAYS, events are frozen into the archive after tonight's
+    # snapshot and skipped from then on (see archive.py).
+    def finish(source, key, ev, total, groups, days_to):
+        if write and is_finished(days_to):
+            archive_event(key, source, ev["name"], int(ev.get("capacity", 0)), total, groups, days_to, CFG["TZ"])
+
+    # Purchase-time histograms (SALES_TIMING=1): fold in tonight's new rows before any archiving.
+    # Best effort; a failure here never costs the snapshot.
+    def fold_timing(source, name, sync):
+        if not (write and sales_timing.enabled()):
+            return
+        try:
+            print(f"[timing][{source}] {name}: {sync()} new rows folded")
+        except Exception as e:
+            print(f"[timing][{source}] {name} failed: {e}")
+
+    # Each job snapshots one event and returns its days to the show (None if unknown).
+    def plankton_job(show):
         js = get_event_summary(show["event_guid"])
         tinfo = js.get("TicketInfo", [])
         groups = show.get("groups", {})
@@ -34,38 +172,105 @@ def run():
         goue = _sum_by_names(tinfo, groups.get("Goue Kraal"))
         total_included = ga + kids + goue
 
-        changed = save_snapshot(show["event_guid"], today_str, total_included)
+        changed = save(show["event_guid"], today_str, total_included, {"ga": ga, "kids": kids, "goue": goue})
         print(f"[snapshot][plankton] {show['name']} {today_str} = {total_included} ({'saved' if changed else 'unchanged'})")
+        days_to = _days_to_event_from_eventdate(js.get("EventDate"), CFG["TZ"])
+        finish("plankton", show["event_guid"], show, total_included, {"ga": ga, "kids": kids, "goue": goue}, days_to)
+        return days_to
 
-    # --- QUICKET (new) ---
-    for ev in QUICKET_EVENTS:
-        ev_id = ev["id"]
+    def quicket_job(ev):
         name = ev["name"]
-        groups = ev.get("groups", {})
-        sums = quicket_summarize(ev_id, groups)
+        key = f"quicket:{ev['id']}"
+        sums = quicket_summarize(ev["id"], ev.get("groups", {}))
         total_included = int(sums["total"])  # Adults + Kids
 
-        key = f"quicket:{ev_id}"
-        changed = save_snapshot(key, today_str, total_included)
+        changed = save(key, today_str, total_included, {"ga": int(sums["adults"]), "kids": int(sums["kids"])})
         print(f"[snapshot][quicket] {name} {today_str} = {total_included} ({'saved' if changed else 'unchanged'})")
+        fold_timing("quicket", name, lambda: sales_timing.sync_quicket(ev, CFG["TZ"]))
+        days_to = _quicket_days_to(ev, CFG["TZ"]) if write else None
+        finish("quicket", key, ev, total_included, {"ga": int(sums["adults"]), "kids": int(sums["kids"])}, days_to)
+        return days_to
 
-    # --- ITICKETS (new) ---
-    for ev in ITICKETS_EVENTS:
-        eid = str(ev["eid"])
+    def itickets_job(ev):
         name = ev["name"]
+        key = f"itickets:{ev['eid']}"
         url = os.getenv(ev["feed_url_env"], "")
         if not url:
             raise RuntimeError(f"Missing env var for iTickets feed URL: {ev['feed_url_env']}")
 
-        rows = fetch_itickets_csv_via_curl(url)
-        sums = summarize_itickets_total(rows)
+        text = fetch_itickets_text_via_curl(url)
+        sums = summarize_itickets_text(text)
         total_included = int(sums["total_sold"])
 
-        key = f"itickets:{eid}"
-        changed = save_snapshot(key, today_str, total_included)
+        changed = save(key, today_str, total_included, {"normal": int(sums["normal"]), "vip": int(sums["vip"])})
         print(f"[snapshot][itickets] {name} {today_str} = {total_included} ({'saved' if changed else 'unchanged'})")
+        fold_timing("itickets", name, lambda: sales_timing.sync_itickets(ev, CFG["TZ"], text=text))
+        dte = None
+        if ev.get("event_date_date"):
+            dte = _days_to(datetime.strptime(ev["event_date_date"], "%Y-%m-%d").date(), CFG["TZ"])
+        finish("itickets", key, ev, total_included, {"normal": int(sums["normal"]), "vip": int(sums["vip"])}, dte)
+        return dte
+
+    candidates = [("plankton", s["event_guid"], s, plankton_job) for s in SHOWS]
+    candidates += [("quicket", f"quicket:{e['id']}", e, quicket_job) for e in QUICKET_EVENTS]
+    candidates += [("itickets", f"itickets:{e['eid']}", e, itickets_job) for e in ITICKETS_EVENTS]
+    queue, names = [], {}
+    for source, key, ev, job in candidates:
+        if key in done:
+            continue
+        if _archived(source, key, ev["name"]) or blocked(source, key, ev["name"]):
+            continue
+        names[key] = ev["name"]
+        queue.append((_priority(key, ev, dates, today), key, source, lambda ev=ev, job=job: job(ev)))
+    queue.sort(key=lambda q: q[0])
 
+    def checkpoint(key, days_to):
+        if not write:
+            return
+        cp["done"].append(key)
+        if days_to is not None:
+            dates[key] = (today + timedelta(days=days_to)).isoformat()
+        _save_checkpoint(cp)
+
+    results, left = run_queue([(key, source, fn) for _, key, source, fn in queue], budget, checkpoint)
+    failed = [f"{names[k]} ({r})" for k, r in results.items() if isinstance(r, Exception)]
+    for f in failed:
+        print(f"[snapshot] failed: {f}")
+    if write:
+        _save_dates(dates)
+        if left or failed or skipped:
+            _save_checkpoint(cp)
+        else:
+            _clear_checkpoint()
+    if left:
+        print(f"[snapshot] budget of {budget:g}s used up; {len(left)} event(s) left, rerun to resume")
+    if left or failed or skipped:
+        raise RuntimeError(f"Snapshot incomplete: {len(failed)} failed, {len(skipped)} skipped by preflight, {len(left)} not reached")
     return 0
 
 if __name__ == "__main__":
-    raise SystemExit(run())
\ No newline at end of file
+    import argparse
+    from . import httpclient, tracing
+    parser = argparse.ArgumentParser(description="Nightly snapshot of ticket totals")
+    parser.add_argument("--no-write", action="store_true",
+                        help="Fetch and print totals without touching the snapshot store")
+    parser.add_argument("--record", metavar="CASSETTE", help="Record API traffic to a gzipped cassette")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Serve API traffic from a cassette (implies --no-write)")
+    parser.add_argument("--replay-latency", choices=["zero", "recorded"], default="zero")
+    parser.add_argument("--trace", metavar="OUT_JSON", help="Write a Chrome/Perfetto trace of the run")
+    parser.add_argument("--tenants", metavar="FILE", help="Snapshot every tenant in this JSON file (default: env TENANTS_FILE)")
+    parser.add_argument("--budget", type=float, default=float(os.getenv("SNAPSHOT_BUDGET") or 0) or None,
+                        help="Start no new fetch after this many seconds; a rerun resumes (default: env SNAPSHOT_BUDGET)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an unfinished run's checkpoint and start over")
+    parser.add_argument("--resume-only", action="store_true",
+                        help="Only finish an interrupted run (within SNAPSHOT_RESUME_HOURS); otherwise do nothing")
+    args = parser.parse_args()
+
+    from .config import load_tenants
+    from .scheduler import for_each_tenant
+    tracing.configure_from_args(args.trace)
+    httpclient.configure_from_args(args.record, args.replay, args.replay_latency)
+    write = not (args.no_write or args.replay)
+    results = for_each_tenant(load_tenants(args.tenants),
+                              lambda: run(write=write, budget=args.budget, fresh=args.fresh, resume_only=args.resume_only))
+    raise SystemExit(1 if any(isinstance(r, Exception) for r in results.values()) else 0)
\ No newline at end of file
@@ -0,0 +1,215 @@
+# spoegwolf_daily/dashboard.py
+"""
+Static dashboard built from the snapshot store (no API calls).
+
+  python -m spoegwolf_daily.dashboard               # -> site/
+  python -m spoegwolf_daily.dashboard --out public --force
+
+  site/index.html          every show + the Shopify windows
+  site/<slug>.html         one page per show: cumulative sales, daily deltas, % of capacity
+  site/data/<slug>.json    compact series the page loads: {"start", "cum": [...], "weeks", ...}
+  site/manifest.json       {file: input hash}; only files whose hash changed are rewritten
+
+Totals come from data/snapshots (end-of-day), the latest collected totals from the
+last-good cache of the morning run, Shopify windows from the local order store.
+"""
+from __future__ import annotations
+import os, json, hashlib, argparse
+from functools import lru_cache
+from datetime import datetime, date, timedelta
+from html import escape
+from typing import Dict, Any, List, Optional
+import pytz
+
+from .config import CFG, SHOWS, QUICKET_EVENTS, ITICKETS_EVENTS
+from .snapshot_store import list_keys, load_snapshots, load_rollup
+from .last_good import load_last_good, age_label
+
+
+def _slug(key: str) -> str:
+    return key.replace(":", "-")
+
+def _events() -> List[Dict[str, Any]]:
+    """Configured shows first (name, capacity), then any other key found in the store."""
+    evs = [{"key": s["event_guid"], "lg": f"plankton:{s['event_guid']}", "name": s["name"],
+            "capacity": int(s.get("capacity", 0))} for s in SHOWS]
+    evs += [{"key": f"quicket:{e['id']}", "lg": f"quicket:{e['id']}", "name": e["name"],
+             "capacity": int(e.get("capacity", 0))} for e in QUICKET_EVENTS]
+    evs += [{"key": f"itickets:{e['eid']}", "lg": f"itickets:{e['eid']}", "name": e["name"],
+             "capacity": int(e.get("capacity", 0))} for e in ITICKETS_EVENTS]
+    known = {e["key"] for e in evs}
+    for k in list_keys():
+        if k not in known:
+            evs.append({"key": k, "lg": k if ":" in k else f"plankton:{k}", "name": k, "capacity": 0})
+    return evs
+
+def event_data(ev: Dict[str, Any], tz: str) -> Optional[Dict[str, Any]]:
+    """Pre-aggregated page data: a gap-filled cumulative series plus weekly/monthly sales."""
+    snaps = load_snapshots(ev["key"])
+    if not snaps:
+        return None
+    dates = sorted(snaps)
+    d, last = date.fromisoformat(dates[0]), date.fromisoformat(dates[-1])
+    cum, run = [], 0
+    while d <= last:
+        run = snaps.get(d.isoformat(), run)
+        cum.append(run)
+        d += timedelta(days=1)
+    roll = load_rollup(ev["key"])
+    data = {
+        "key": ev["key"], "name": ev["name"], "cap": ev["capacity"], "start": dates[0], "cum": cum,
+        "weeks": {p: c - o for p, (o, c) in roll["week"].items() if o is not None},
+        "months": {p: c - o for p, (o, c) in roll["month"].items() if o is not None},
+    }
+    lg = load_last_good(ev["lg"])
+    if lg and isinstance(lg[0], dict) and "total" in lg[0]:
+        data["live"] = {"total": int(lg[0]["total"]), "at": age_label(lg[1], tz)}
+        data["cap"] = data["cap"] or int(lg[0].get("capacity") or 0)
+    return data
+
+def shopify_data(tz: str) -> Optional[List[Dict[str, Any]]]:
+    from .data_sources.shopify import store_file, WINDOWS, DailyRollup, _load_store, shopify_windows
+    if not os.path.exists(store_file()):
+        return None
+    today = datetime.now(pytz.timezone(tz)).date()
+    store = _load_store()
+    if not store.get("orders"):
+        return None
+    return shopify_windows(DailyRollup.from_store(store, tz, today), today, list(WINDOWS), top_n=3)
+
+# -------------------- rendering --------------------
+
+_STYLE = ("body{font-family:system-ui,sans-serif;max-width:860px;margin:2em auto;padding:0 1em;color:#222}"
+          "table{border-collapse:collapse}td,th{padding:.2em .8em;text-align:right}td:first-child,"
+          "th:first-child{text-align:left}tr:nth-child(even){background:#f4f4f4}.muted{color:#888}")
+
+# Draws the cumulative line and daily bars from data/<slug>.json
+_CHART_JS = """
+fetch(%s).then(r=>r.json()).then(d=>{
+ const c=d.cum,n=c.length,W=800,H=240,top=Math.max(d.cap||0,c[n-1],1);
+ const x=i=>n<2?0:i*W/(n-1),y=v=>H-v*H/top;
+ const dl=c.map((v,i)=>i?v-c[i-1]:0),mx=Math.max(1,...dl);
+ let s=`<svg viewBox="0 0 ${W} ${H}" width="100%%">`;
+ dl.forEach((v,i)=>{if(v>0)s+=`<rect x="${x(i)-1}" y="${H-v*H/3/mx}" width="2" height="${v*H/3/mx}" fill="#bbb"/>`});
+ if(d.cap)s+=`<line x1="0" x2="${W}" y1="${y(d.cap)}" y2="${y(d.cap)}" stroke="#d33" stroke-dasharray="4"/>`;
+ s+=`<polyline fill="none" stroke="#246" stroke-width="2" points="${c.map((v,i)=>x(i)+','+y(v)).join(' ')}"/></svg>`;
+ document.getElementById('chart').innerHTML=s;
+});
+"""
+
+def _pct(total: int, cap: int) -> str:
+    return f"{round(100 * total / cap)}%" if cap > 0 else "–"
+
+def _page_html(data: Dict[str, Any]) -> str:
+    cum = data["cum"]
+    total = cum[-1]
+    start = date.fromisoformat(data["start"])
+    rows = []
+    for i in range(len(cum) - 1, max(0, len(cum) - 15), -1):
+        day = (start + timedelta(days=i)).isoformat()
+        rows.append(f"<tr><td>{day}</td><td>{cum[i] - cum[i - 1]}</td><td>{cum[i]}</td></tr>")
+    weeks = "".join(f"<tr><td>{p}</td><td>{n}</td></tr>" for p, n in sorted(data["weeks"].items())[-8:][::-1])
+    live = data.get("live")
+    live_line = (f"<p>Laaste telling: <b>{live['total']}</b> <span class=muted>(data van {live['at']})</span></p>"
+                 if live else "")
+    return f"""<!doctype html><html><head><meta charset="utf-8">
+<title>{escape(data['name'])}</title><style>{_STYLE}</style></head><body>
+<p><a href="index.html">&larr; Alle shows</a></p>
+<h1>{escape(data['name'])}</h1>
+<p>Total Sold (end of {escape((start + timedelta(days=len(cum) - 1)).isoformat())}): <b>{total}</b>
+ &middot; Sold Out % (Uit {data['cap']:,}): <b>{_pct(total, data['cap'])}</b></p>
+{live_line}<div id="chart"></div>
+<h2>Daaglikse verkope</h2><table><tr><th>Dag</th><th>Verkoop</th><th>Totaal</th></tr>{''.join(rows)}</table>
+<h2>Weeklikse verkope</h2><table><tr><th>Week</th><th>Verkoop</th></tr>{weeks}</table>
+<script>{_CHART_JS % json.dumps('data/' + _slug(data['key']) + '.json')}</script>
+</body></html>
+"""
+
+def _index_html(pages: List[Dict[str, Any]], shop: Optional[List[Dict[str, Any]]], built: str) -> str:
+    rows = []
+    for d in pages:
+        cum = d["cum"]
+        yday = cum[-1] - cum[-2] if len(cum) > 1 else ""
+        rows.append(f"<tr><td><a href=\"{_slug(d['key'])}.html\">{escape(d['name'])}</a></td>"
+                    f"<td>{cum[-1]}</td><td>{yday}</td><td>{_pct(cum[-1], d['cap'])}</td></tr>")
+    shop_html = ""
+    if shop:
+        items = "".join(f"<tr><td>{escape(w['label'])}</td><td>R{w['sales']:,.2f}</td><td>{w['orders']}</td>"
+                        f"<td>{escape(', '.join(t['title'] for t in w['top_items']))}</td></tr>" for w in shop)
+        shop_html = ("<h2>🛒 Shopify</h2><table><tr><th></th><th>Verkope</th><th>Bestellings</th>"
+                     f"<th>Top items</th></tr>{items}</table>")
+    return f"""<!doctype html><html><head><meta charset="utf-8">
+<title>{escape(CFG.get("REPORT_TITLE") or "Spoegwolf")}</title><style>{_STYLE}</style></head><body>
+<h1>{escape(CFG.get("REPORT_TITLE") or "Spoegwolf")}</h1>{shop_html}
+<h2>🎟️ Shows</h2><table><tr><th>Show</th><th>Total Sold</th><th>Laaste dag</th><th>Sold Out %</th></tr>{''.join(rows)}</table>
+<p class=muted>Gebou {escape(built)}</p>
+</body></html>
+"""
+
+# -------------------- incremental build --------------------
+
+@lru_cache(maxsize=1)
+def _stamp() -> str:
+    """Hash of this module's source (mtimes change on every CI checkout)."""
+    with open(__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def _digest(obj: Any) -> str:
+    blob = json.dumps([obj, _stamp()], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def build(out_dir: str = "site", force: bool = False) -> int:
+    """Render the site into out_dir; returns the number of files written."""
+    tz = CFG["TZ"]
+    os.makedirs(os.path.join(out_dir, "data"), exist_ok=True)
+    manifest_p = os.path.join(out_dir, "manifest.json")
+    manifest: Dict[str, str] = {}
+    if not force and os.path.exists(manifest_p):
+        with open(manifest_p, "r", encoding="utf-8") as f:
+            try:
+                manifest = json.load(f)
+            except json.JSONDecodeError:
+                manifest = {}
+
+    written = 0
+    def emit(name: str, digest: str, render):
+        nonlocal written
+        p = os.path.join(out_dir, name)
+        if manifest.get(name) == digest and os.path.exists(p):
+            return
+        with open(p, "w", encoding="utf-8") as f:
+            f.write(render())
+        manifest[name] = digest
+        written += 1
+
+    pages = []
+    for ev in _events():
+        data = event_data(ev, tz)
+        if data is None:
+            continue
+        pages.append(data)
+        h = _digest(data)
+        slug = _slug(ev["key"])
+        emit(f"data/{slug}.json", h, lambda: json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+        emit(f"{slug}.html", h, lambda: _page_html(data))
+
+    shop = shopify_data(tz)
+    index_inputs = [[d["key"], d["name"], d["cap"], d["cum"][-2:]] for d in pages]
+    built = datetime.now(pytz.timezone(tz)).strftime("%Y-%m-%d %H:%M")
+    emit("index.html", _digest([index_inputs, shop]), lambda: _index_html(pages, shop, built))
+
+    with open(manifest_p, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    print(f"[dashboard] {len(pages)} shows, {written} files written to {out_dir}/")
+    return written
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Build the static sales dashboard")
+    ap.add_argument("--out", default=os.getenv("DASHBOARD_DIR", "site"), help="output directory")
+    ap.add_argument("--force", action="store_true", help="rewrite every page")
+    args = ap.parse_args(argv)
+    build(args.out, force=args.force)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,10 +4,18 @@ import csv
 import io
 import os
 import subprocess
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional
 
+from .. import httpclient, parse_pool
+from ..tracing import traced, span
 
-def fetch_itickets_csv_via_curl(url: str) -> List[Dict[str, Any]]:
+
+def fetch_itickets_text_via_curl(url: str) -> str:
+    """Raw CSV text ('' if the feed is empty)."""
+    return httpclient.fetch_text("itickets", url, lambda: _curl(url))
+
+
+def _curl(url: str) -> str:
     proc = subprocess.run(
         ["curl", "-sSL", url],
         capture_output=True,
@@ -19,36 +27,99 @@ def fetch_itickets_csv_via_curl(url: str) -> List[Dict[str, Any]]:
 
     text = proc.stdout.strip()
     if not text:
-        return []
+        return ""
 
-    first = text.splitlines()[0].strip().lower()
-    if first == "key":
-        raise RuntimeError("iTickets returned 'key' (request rejected / invalid key).")
+    problem = feed_problem(text)
+    if problem:
+        raise RuntimeError(problem)
+    return proc.stdout
 
-    reader = csv.DictReader(io.StringIO(proc.stdout))
-    return list(reader)
+
+def feed_problem(head: str) -> Optional[str]:
+    """Why a feed body (or just its first bytes) is an error page rather than CSV; None if fine."""
+    lines = head.strip().splitlines()
+    if lines and lines[0].strip().lower() == "key":
+        return "iTickets returned 'key' (request rejected / invalid key)."
+    return None
+
+
+@traced("itickets.fetch_itickets_csv_via_curl")
+def fetch_itickets_csv_via_curl(url: str) -> List[Dict[str, Any]]:
+    with span("itickets.curl"):
+        text = fetch_itickets_text_via_curl(url)
+    if not text:
+        return []
+    with span("itickets.parse"):
+        reader = csv.DictReader(io.StringIO(text))
+        return list(reader)
 
 
-def summarize_itickets_total(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
-    def is_void(r: Dict[str, Any]) -> bool:
-        return (r.get("VOID") or "").strip() == "1"
+def classify_row(r: Dict[str, Any]) -> Optional[str]:
+    """'normal' | 'vip', or None for voided rows."""
+    if (r.get("VOID") or "").strip() == "1":
+        return None
+    if (r.get("type") or "").strip().lower() == "vip":
+        return "vip"
+    return "normal"
 
-    def is_vip(r: Dict[str, Any]) -> bool:
-        return (r.get("type") or "").strip().lower() == "vip"
 
+@traced("itickets.summarize_itickets_total")
+def summarize_itickets_total(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
     normal = 0
     vip = 0
 
     for r in rows:
-        if is_void(r):
-            continue
-        if is_vip(r):
+        bucket = classify_row(r)
+        if bucket == "vip":
             vip += 1
-        else:
+        elif bucket == "normal":
             normal += 1
 
     return {
         "normal": int(normal),
         "vip": int(vip),
         "total_sold": int(normal + vip),
-    }
\ No newline at end of file
+    }
+
+
+def _count_chunk(header: str, chunk: str) -> Dict[str, Any]:
+    """Parse-pool worker: parse and classify one CSV chunk, return only the counts."""
+    return summarize_itickets_total(csv.DictReader(io.StringIO(header + chunk)))
+
+
+def _csv_chunks(text: str, size: int):
+    """(header line, [chunks of whole records of roughly `size` chars])."""
+    nl = text.find("\n")
+    if nl < 0:
+        return text, []
+    header, pos, chunks = text[:nl + 1], nl + 1, []
+    while pos < len(text):
+        end = text.find("\n", min(len(text), pos + size))
+        end = len(text) if end < 0 else end + 1
+        while text.count('"', pos, end) % 2 and end < len(text):  # a quoted field spans the cut
+            nxt = text.find("\n", end)
+            end = len(text) if nxt < 0 else nxt + 1
+        chunks.append(text[pos:end])
+        pos = end
+    return header, chunks
+
+
+def summarize_itickets_text(text: str) -> Dict[str, Any]:
+    """summarize_itickets_total over raw CSV text; big feeds are split across the parse pool."""
+    if not text:
+        return summarize_itickets_total([])
+    if not parse_pool.worth_it(len(text)):
+        with span("itickets.parse"):
+            return summarize_itickets_total(csv.DictReader(io.StringIO(text)))
+    with span("itickets.parse_pooled"):
+        header, chunks = _csv_chunks(text, max(256 * 1024, len(text) // (parse_pool.workers() * 4)))
+        futs = [parse_pool.submit(_count_chunk, header, c) for c in chunks]
+        return parse_pool.merge_counts(f.result() for f in futs)
+
+
+@traced("itickets.summarize_itickets_feed")
+def summarize_itickets_feed(url: str) -> Dict[str, Any]:
+    """Fetch + summarize without materializing the row list."""
+    with span("itickets.curl"):
+        text = fetch_itickets_text_via_curl(url)
+    return summarize_itickets_text(text)
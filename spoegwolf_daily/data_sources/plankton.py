@@ -1,6 +1,8 @@
 import os, time, requests
 from typing import Dict, Any
 from ..config import CFG
+from .. import httpclient
+from ..tracing import traced
 
 BASE = "https://plankton.mobi"
 
@@ -36,6 +38,7 @@ def _timeouts():
     rt = _safe_float_env("REQUEST_READ_TIMEOUT", 15.0)
     return (ct, rt)
 
+@traced("plankton.get_event_summary")
 def get_event_summary(event_guid: str) -> Dict[str, Any]:
     url = f"{BASE}/api/v2/events/summary/{event_guid}"
     headers = _headers()
@@ -45,7 +48,7 @@ def get_event_summary(event_guid: str) -> Dict[str, Any]:
     last_err = None
     for attempt in range(retries + 1):
         try:
-            r = requests.get(url, headers=headers, timeout=_timeouts())
+            r = httpclient.get("plankton", url, headers=headers, timeout=_timeouts())
             r.raise_for_status()
             return r.json()
         except requests.HTTPError as e:
@@ -1,12 +1,14 @@
 # spoegwolf_daily/data_sources/quicket.py
 from __future__ import annotations
-import os, time
-from typing import Dict, Any, Iterable, List, Tuple, Optional
+import os, json, time
+from typing import Dict, Any, Callable, Iterable, List, Tuple, Optional
 import requests
 from datetime import datetime
 import pytz
 
 from ..config import CFG
+from .. import httpclient, parse_pool
+from ..tracing import traced, span
 
 BASE = "https://api.quicket.co.za"
 
@@ -23,12 +25,18 @@ def _headers() -> Dict[str, str]:
     }
 
 
-def _get_page(event_id: int, page: int, page_size: int = 500) -> Dict[str, Any]:
+def _get_page_bytes(event_id: int, page: int, page_size: int = 500) -> bytes:
     # The API returns "pages" and "pageSize" in the envelope; typical params: page & pagesize
     url = f"{BASE}/api/events/{event_id}/guests?page={page}&pagesize={page_size}"
-    r = requests.get(url, headers=_headers(), timeout=_timeouts())
+    r = httpclient.get("quicket", url, headers=_headers(), timeout=_timeouts())
     r.raise_for_status()
-    return r.json()
+    return r.content
+
+@traced("quicket._get_page")
+def _get_page(event_id: int, page: int, page_size: int = 500) -> Dict[str, Any]:
+    raw = _get_page_bytes(event_id, page, page_size)
+    with span("quicket.decode", page=page):
+        return json.loads(raw)
 
 def _safe_int_env(name: str, default: int) -> int:
     v = os.getenv(name, "")
@@ -50,47 +58,77 @@ def _timeouts() -> Tuple[float, float]:
     return (ct, rt)
 
 
-def iter_all_guests(event_id: int) -> Iterable[Dict[str, Any]]:
+def _retrying(event_id: int, fetch: Callable[[], Any]) -> Any:
+    """fetch() with brief retries on network errors; HTTP errors fail at once."""
+    retries = int(os.getenv("REQUEST_RETRIES", "2"))
+    for attempt in range(retries + 1):
+        try:
+            return fetch()
+        except requests.HTTPError as e:
+            body = ""
+            try:
+                body = (e.response.text or "")[:300].replace("\n", " ")
+            except Exception:
+                pass
+            code = getattr(e.response, "status_code", "?")
+            raise RuntimeError(f"Quicket HTTP {code} for event {event_id} — {body}") from e
+        except requests.RequestException as e:
+            if attempt < retries:
+                time.sleep(1.5 ** attempt)
+                continue
+            raise RuntimeError(f"Quicket request error for event {event_id}: {e}") from e
+
+def _iter_pages(event_id: int, start_page: int = 1) -> Iterable[Tuple[int, Dict[str, Any]]]:
     """
-    Iterate all guest rows, handling pagination with brief retries.
+    Yield (page number, page envelope) from start_page on, handling pagination with brief retries.
+    Stops after the last page or the first empty one.
     """
-    retries = int(os.getenv("REQUEST_RETRIES", "2"))
-    page = 1
+    page = start_page
     while True:
-        last_err = None
-        for attempt in range(retries + 1):
-            try:
-                js = _get_page(event_id, page)
-                break
-            except requests.HTTPError as e:
-                body = ""
-                try:
-                    body = (e.response.text or "")[:300].replace("\n", " ")
-                except Exception:
-                    pass
-                code = getattr(e.response, "status_code", "?")
-                raise RuntimeError(f"Quicket HTTP {code} for event {event_id} — {body}") from e
-            except requests.RequestException as e:
-                last_err = e
-                if attempt < retries:
-                    time.sleep(1.5 ** attempt)
-                    continue
-                raise RuntimeError(f"Quicket request error for event {event_id}: {e}") from e
-
-        results = js.get("results") or []
-        if not results:
+        js = _retrying(event_id, lambda: _get_page(event_id, page))
+        yield page, js
+        if not js.get("results"):
             return
-        for row in results:
-            yield row
 
         pages = int(js.get("pages") or 1)
         if page >= pages:
             return
         page += 1
 
+@traced("quicket.iter_all_guests")
+def iter_all_guests(event_id: int) -> Iterable[Dict[str, Any]]:
+    """
+    Iterate all guest rows, handling pagination with brief retries.
+    """
+    for _, js in _iter_pages(event_id):
+        for row in js.get("results") or []:
+            yield row
+
 def _norm(s: str) -> str:
     return (s or "").strip().lower()
 
+def _group_sets(groups: Dict[str, List[str]]) -> Tuple[set, set, set]:
+    adults_set  = {_norm(n) for n in (groups.get("Adults") or [])}
+    kids_set    = {_norm(n) for n in (groups.get("Kids") or [])}
+    exclude_set = {_norm(n) for n in (groups.get("exclude") or [])}
+    return adults_set, kids_set, exclude_set
+
+def classify_guest(g: Dict[str, Any], sets: Tuple[set, set, set]) -> Optional[str]:
+    """
+    'adults' | 'kids' | 'excluded', or None for invalid guests.
+    Unknown ticket types fall into 'adults' (adjust to 'excluded' if you prefer).
+    """
+    if not bool(g.get("Valid", True)):
+        return None
+    adults_set, kids_set, exclude_set = sets
+    ttype = _norm(g.get("TicketType"))
+    if ttype in exclude_set:
+        return "excluded"
+    if ttype in kids_set and ttype not in adults_set:
+        return "kids"
+    return "adults"
+
+@traced("quicket.summarize_event")
 def summarize_event(event_id: int, groups: Dict[str, List[str]]) -> Dict[str, int]:
     """
     Classify by TicketType (case-insensitive exact match).
@@ -103,36 +141,86 @@ def summarize_event(event_id: int, groups: Dict[str, List[str]]) -> Dict[str, in
         "raw_total": int
       }
     """
-    adults_set  = {_norm(n) for n in (groups.get("Adults") or [])}
-    kids_set    = {_norm(n) for n in (groups.get("Kids") or [])}
-    exclude_set = {_norm(n) for n in (groups.get("exclude") or [])}
+    if parse_pool.workers():
+        return _summarize_pooled(event_id, groups)
+    return summarize_guests(iter_all_guests(event_id), groups)
 
-    adults = kids = excluded = raw_total = 0
+def _count_page(raw: bytes, groups: Dict[str, List[str]]) -> Dict[str, int]:
+    """Parse-pool worker: decode and classify one raw page, return only the counts."""
+    return summarize_guests(json.loads(raw).get("results") or [], groups)
 
-    for g in iter_all_guests(event_id):
-        raw_total += 1
-        if not bool(g.get("Valid", True)):
-            continue
-
-        ttype = _norm(g.get("TicketType"))
-        if ttype in exclude_set:
-            excluded += 1
-            continue
-
-        if ttype in adults_set:
-            adults += 1
-        elif ttype in kids_set:
-            kids += 1
+def _summarize_pooled(event_id: int, groups: Dict[str, List[str]]) -> Dict[str, int]:
+    """
+    summarize_event with PARSE_WORKERS set. Page 1 is decoded here (it carries the page count);
+    if pages x its size reaches PARSE_POOL_MIN_BYTES, the other pages go to the worker
+    processes as raw bytes while the next ones download, otherwise all stays in-process.
+    """
+    raw = _retrying(event_id, lambda: _get_page_bytes(event_id, 1))
+    js = json.loads(raw)
+    parts = [summarize_guests(js.get("results") or [], groups)]
+    pages = int(js.get("pages") or 1)
+    if js.get("results") and pages > 1:
+        if parse_pool.worth_it(len(raw) * pages):
+            futs = [parse_pool.submit(_count_page, _retrying(event_id, lambda p=p: _get_page_bytes(event_id, p)), groups)
+                    for p in range(2, pages + 1)]
+            parts += [f.result() for f in futs]
         else:
-            # default bucket if unknown type (adjust to 'excluded' if you prefer)
-            adults += 1
+            rest = (g for _, page_js in _iter_pages(event_id, 2) for g in page_js.get("results") or [])
+            parts.append(summarize_guests(rest, groups))
+    return parse_pool.merge_counts(parts)
+
+def summarize_guests(guests: Iterable[Dict[str, Any]], groups: Dict[str, List[str]]) -> Dict[str, int]:
+    """summarize_event over any iterable of guest rows (no I/O; used by bench.py)."""
+    sets = _group_sets(groups)
+    counts = {"adults": 0, "kids": 0, "excluded": 0}
+    raw_total = 0
+
+    for g in guests:
+        raw_total += 1
+        bucket = classify_guest(g, sets)
+        if bucket is not None:
+            counts[bucket] += 1
 
+    return {
+        "adults": counts["adults"],
+        "kids": counts["kids"],
+        "total": counts["adults"] + counts["kids"],
+        "excluded": counts["excluded"],
+        "raw_total": raw_total,
+    }
+
+@traced("quicket.summarize_event_incremental")
+def summarize_event_incremental(event_id: int, groups: Dict[str, List[str]], state: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Same result as summarize_event, for pollers. `state` keeps per-page counts between calls;
+    only the last known page onward is re-fetched (the guest list grows at the end).
+    Pass a fresh dict now and then to pick up invalidations on earlier pages.
+    """
+    sets = _group_sets(groups)
+    page_counts: Dict[int, Dict[str, int]] = state.setdefault("page_counts", {})
+    last = start = int(state.get("last_page") or 1)
+
+    for page, js in _iter_pages(event_id, start):
+        c = {"adults": 0, "kids": 0, "excluded": 0, "raw": 0}
+        for g in js.get("results") or []:
+            c["raw"] += 1
+            bucket = classify_guest(g, sets)
+            if bucket is not None:
+                c[bucket] += 1
+        page_counts[page] = c
+        last = page
+    for p in [p for p in page_counts if p > last]:
+        del page_counts[p]
+    state["last_page"] = last
+
+    adults = sum(c["adults"] for c in page_counts.values())
+    kids = sum(c["kids"] for c in page_counts.values())
     return {
         "adults": adults,
         "kids": kids,
         "total": adults + kids,
-        "excluded": excluded,
-        "raw_total": raw_total,
+        "excluded": sum(c["excluded"] for c in page_counts.values()),
+        "raw_total": sum(c["raw"] for c in page_counts.values()),
     }
 
 # ---- Optional: cheap event date probe (first page only) ----
@@ -2,13 +2,19 @@
 from __future__ import annotations
 
 import os
-import requests
+import json
+import argparse
+import time
 import datetime as dt
+import heapq
+from bisect import bisect_left
 from typing import Dict, Any, List, Optional
 import pytz
 from urllib.parse import urlparse
 
-from ..config import CFG
+from ..config import CFG, namespaced
+from .. import httpclient
+from ..tracing import traced
 
 # -------------------- config + helpers --------------------
 
@@ -26,23 +32,26 @@ def _normalize_base(raw: Optional[str]) -> str:
     # remove any accidental path fragments
     return raw.split("/")[0].strip()
 
-BASE = _normalize_base(CFG.get("SHOPIFY_BASE"))
-TOKEN = CFG.get("SHOPIFY_ACCESS_TOKEN")
 # Use one API version. You can override via env secret SHOPIFY_API_VERSION.
 API_VER = os.getenv("SHOPIFY_API_VERSION", "2024-10")
 
+# Read per call: the active tenant decides which shop we talk to
+def _base() -> str:
+    return _normalize_base(CFG.get("SHOPIFY_BASE"))
+
 def _headers() -> Dict[str, str]:
-    if not BASE or not TOKEN:
+    token = CFG.get("SHOPIFY_ACCESS_TOKEN")
+    if not _base() or not token:
         raise RuntimeError("Missing SHOPIFY_BASE or SHOPIFY_ACCESS_TOKEN")
     return {
-        "X-Shopify-Access-Token": TOKEN,
+        "X-Shopify-Access-Token": token,
         "Accept": "application/json",
         "User-Agent": "spoegwolf-daily/1.0",
     }
 
 def _orders_url() -> str:
     # Build a clean base URL: https://<host>/admin/api/<ver>/orders.json
-    return f"https://{BASE}/admin/api/{API_VER}/orders.json"
+    return f"https://{_base()}/admin/api/{API_VER}/orders.json"
 
 def _iso_utc(dt_local: dt.datetime, tz_name: str) -> str:
     """
@@ -100,31 +109,25 @@ def _pick_top_item(orders: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
 
 # -------------------- API calls --------------------
 
-def _fetch_orders(created_min_iso: str, created_max_iso: str, status: str = "paid") -> List[Dict[str, Any]]:
+_ORDER_FIELDS = ",".join([
+    "id","created_at","updated_at","currency",
+    "current_subtotal_price","subtotal_price","total_line_items_price",
+    "line_items","financial_status","cancelled_at"
+])
+
+def _fetch_pages(params: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
-    Fetch orders in [created_min, created_max] using REST with cursor pagination.
+    GET orders.json with cursor pagination.
     We request 250 per page and follow Link headers (page_info).
     """
     orders: List[Dict[str, Any]] = []
-    params = {
-        "limit": 250,
-        "status": "any",              # include all, then filter by financial_status
-        "financial_status": status,   # paid only (you can change to 'any' if needed)
-        "created_at_min": created_min_iso,
-        "created_at_max": created_max_iso,
-        "fields": ",".join([
-            "id","created_at","currency",
-            "current_subtotal_price","subtotal_price","total_line_items_price",
-            "line_items","financial_status","cancelled_at"
-        ]),
-    }
+    params = dict(params, limit=250, fields=_ORDER_FIELDS)
 
-    session = requests.Session()
     url = _orders_url()
     headers = _headers()
 
     while True:
-        r = session.get(url, headers=headers, params=params, timeout=(5, 15))
+        r = httpclient.get("shopify", url, headers=headers, params=params, timeout=(5, 15))
         r.raise_for_status()
         data = r.json() or {}
         batch = data.get("orders") or []
@@ -141,16 +144,253 @@ def _fetch_orders(created_min_iso: str, created_max_iso: str, status: str = "pai
             except Exception:
                 pass
         break
+    return orders
 
-    # Filter: paid / partially paid, not cancelled
-    clean: List[Dict[str, Any]] = []
-    for o in orders:
-        if o.get("cancelled_at"):
-            continue
-        if (o.get("financial_status") or "").lower() not in ("paid", "partially_paid"):
-            continue
-        clean.append(o)
-    return clean
+def _is_counted(o: Dict[str, Any]) -> bool:
+    """Paid, not cancelled (the store keeps every status, so this is the only filter)."""
+    if o.get("cancelled_at"):
+        return False
+    return (o.get("financial_status") or "").lower() == "paid"
+
+@traced("shopify._fetch_orders")
+def _fetch_orders(created_min_iso: str, created_max_iso: str, status: str = "paid") -> List[Dict[str, Any]]:
+    """Fetch counted orders in [created_min, created_max]."""
+    orders = _fetch_pages({
+        "status": "any",              # include all, then filter by financial_status
+        "financial_status": status,   # paid only (you can change to 'any' if needed)
+        "created_at_min": created_min_iso,
+        "created_at_max": created_max_iso,
+    })
+    return [o for o in orders if _is_counted(o)]
+
+# -------------------- local order store --------------------
+# data/cache/shopify_orders.json keeps a compact copy of every order created in the last
+# SHOPIFY_STORE_DAYS days. Each run only asks Shopify for orders updated since the last
+# sync (updated_at watermark), so refunds/cancellations land without rescanning the window.
+# The first fill ("seeding") walks back from today SEED_CHUNK_DAYS at a time and saves after
+# every chunk; "since" is the first day the store is complete from, so an interrupted seed
+# resumes where it stopped. Seed it ahead of the first run with
+#   python -m spoegwolf_daily.data_sources.shopify sync
+
+STORE_FILE = os.path.join(os.getenv("CACHE_DIR", "data/cache"), "shopify_orders.json")
+
+def store_file() -> str:
+    """STORE_FILE, or the active tenant's copy (data/cache/<namespace>/shopify_orders.json)."""
+    return os.path.join(namespaced(os.path.dirname(STORE_FILE)), os.path.basename(STORE_FILE))
+
+SEED_CHUNK_DAYS = 31
+
+def _store_days() -> int:
+    try:
+        return int(os.getenv("SHOPIFY_STORE_DAYS", "400"))
+    except ValueError:
+        return 400
+
+def _seed_seconds() -> float:
+    """How long a report run may spend seeding (the rest happens on later runs)."""
+    try:
+        return float(os.getenv("SHOPIFY_SEED_SECONDS", "30"))
+    except ValueError:
+        return 30.0
+
+def _compact_order(o: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only what the summaries need; subtotal is pre-resolved so _sum_order_subtotal still applies."""
+    return {
+        "created_at": o.get("created_at"),
+        "updated_at": o.get("updated_at"),
+        "financial_status": o.get("financial_status"),
+        "cancelled_at": o.get("cancelled_at"),
+        "current_subtotal_price": _sum_order_subtotal(o),
+        "line_items": [
+            {"title": (li.get("title") or "").strip(), "quantity": int(li.get("quantity") or 0)}
+            for li in (o.get("line_items") or [])
+        ],
+    }
+
+def _load_store() -> Dict[str, Any]:
+    p = store_file()
+    if not os.path.exists(p):
+        return {}
+    with open(p, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+def _save_store(store: Dict[str, Any]):
+    p = store_file()
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = p + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(store, f, separators=(",", ":"))
+    os.replace(tmp, p)
+
+def _local_date(iso: Optional[str], za) -> Optional[dt.date]:
+    if not iso:
+        return None
+    try:
+        return dt.datetime.fromisoformat(iso.replace("Z", "+00:00")).astimezone(za).date()
+    except ValueError:
+        return None
+
+@traced("shopify.sync_order_store")
+def sync_order_store(tz: Optional[str] = None, seed_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Bring the local store up to date and return it.
+    Until the store reaches back SHOPIFY_STORE_DAYS: seed it, newest month first. With
+    seed_seconds, seeding stops after that long and the store comes back partial (its
+    "since" is later than the retention window); the next call carries on.
+    After that: only orders with updated_at >= watermark.
+    """
+    tz = tz or CFG.get("TZ", "Africa/Johannesburg")
+    za = pytz.timezone(tz)
+    today = dt.datetime.now(za).date()
+    since = today - dt.timedelta(days=_store_days())
+
+    store = _load_store()
+    # Next watermark = sync start, minus a little slack for clock skew; re-seeing an order is harmless
+    started = _iso_utc(dt.datetime.now(za) - dt.timedelta(minutes=5), tz)
+
+    if httpclient.cache_only() and store.get("orders"):
+        return store  # offline: work from the local copy as-is
+
+    if not store.get("watermark"):
+        # empty store: complete from tomorrow; updates made while seeding are caught by the
+        # first incremental sync, from this watermark
+        store = {"since": (today + dt.timedelta(days=1)).isoformat(), "watermark": started, "orders": {}}
+    orders: Dict[str, Any] = store["orders"]
+
+    t0 = time.monotonic()
+    while store["since"] > since.isoformat():
+        if seed_seconds is not None and time.monotonic() - t0 > seed_seconds:
+            print(f"[shopify] seeding paused: store complete from {store['since']}")
+            return store
+        hi = dt.date.fromisoformat(store["since"])
+        lo = max(since, hi - dt.timedelta(days=SEED_CHUNK_DAYS))
+        fetched = _fetch_pages({"status": "any", "financial_status": "any",
+                                "created_at_min": _iso_utc(dt.datetime.combine(lo, dt.time(0, 0, 0)), tz),
+                                "created_at_max": _iso_utc(dt.datetime.combine(hi, dt.time(0, 0, 0)), tz)})
+        for o in fetched:
+            orders[str(o["id"])] = _compact_order(o)
+        store["since"] = lo.isoformat()
+        _save_store(store)
+        print(f"[shopify] seeded {len(fetched)} orders created {lo} .. {hi - dt.timedelta(days=1)}")
+
+    watermark = store["watermark"]
+    fetched = _fetch_pages({"status": "any", "financial_status": "any", "updated_at_min": watermark})
+    print(f"[shopify] incremental sync: {len(fetched)} orders updated since {watermark}")
+    for o in fetched:
+        orders[str(o["id"])] = _compact_order(o)
+
+    # Drop orders that fell out of the retention window
+    orders = {k: o for k, o in orders.items() if (_local_date(o.get("created_at"), za) or today) >= since}
+
+    store.update({"since": max(store["since"], since.isoformat()), "watermark": started, "orders": orders})
+    _save_store(store)
+    return store
+
+def orders_between(store: Dict[str, Any], d0: dt.date, d1: dt.date, tz: str) -> List[Dict[str, Any]]:
+    """Counted orders whose local created date is in [d0, d1]."""
+    za = pytz.timezone(tz)
+    out = []
+    for o in (store.get("orders") or {}).values():
+        d = _local_date(o.get("created_at"), za)
+        if d is not None and d0 <= d <= d1 and _is_counted(o):
+            out.append(o)
+    return out
+
+# -------------------- daily rollups --------------------
+
+class DailyRollup:
+    """
+    Per local day: revenue excl. shipping, order count and per-item quantity, as prefix sums.
+    Revenue/orders for any [d0, d1] window are O(1); an item's quantity is O(log n)
+    (sparse per-item prefix, only days it sold).
+    """
+
+    def __init__(self, start: dt.date, days: int):
+        self.start = start
+        self.days = days
+        self._rev = [0.0] * (days + 1)     # _rev[i] = revenue for days [0, i)
+        self._cnt = [0] * (days + 1)
+        self._items: Dict[str, Any] = {}   # title -> ([day idx], [cumulative qty])
+
+    @classmethod
+    def from_store(cls, store: Dict[str, Any], tz: str, today: dt.date) -> "DailyRollup":
+        za = pytz.timezone(tz)
+        start = dt.date.fromisoformat(store.get("since") or today.isoformat())
+        roll = cls(start, (today - start).days + 1)
+        rev = [0.0] * roll.days
+        cnt = [0] * roll.days
+        per_item: Dict[str, Dict[int, int]] = {}
+        for o in (store.get("orders") or {}).values():
+            d = _local_date(o.get("created_at"), za)
+            if d is None or not _is_counted(o):
+                continue
+            i = (d - start).days
+            if not 0 <= i < roll.days:
+                continue
+            rev[i] += _sum_order_subtotal(o)
+            cnt[i] += 1
+            for li in (o.get("line_items") or []):
+                title, qty = li.get("title") or "", int(li.get("quantity") or 0)
+                if title and qty > 0:
+                    days_qty = per_item.setdefault(title, {})
+                    days_qty[i] = days_qty.get(i, 0) + qty
+        for i in range(roll.days):
+            roll._rev[i + 1] = roll._rev[i] + rev[i]
+            roll._cnt[i + 1] = roll._cnt[i] + cnt[i]
+        for title, days_qty in per_item.items():
+            idx = sorted(days_qty)
+            cum, run = [], 0
+            for i in idx:
+                run += days_qty[i]
+                cum.append(run)
+            roll._items[title] = (idx, cum)
+        return roll
+
+    def _span(self, d0: dt.date, d1: dt.date):
+        i0 = max(0, (d0 - self.start).days)
+        i1 = min(self.days, (d1 - self.start).days + 1)
+        return i0, max(i0, i1)
+
+    def _item_qty(self, title: str, i0: int, i1: int) -> int:
+        idx, cum = self._items[title]
+        hi = bisect_left(idx, i1)
+        lo = bisect_left(idx, i0)
+        return (cum[hi - 1] if hi else 0) - (cum[lo - 1] if lo else 0)
+
+    def window(self, d0: dt.date, d1: dt.date, top_n: int = 1) -> Dict[str, Any]:
+        i0, i1 = self._span(d0, d1)
+        qty = {t: self._item_qty(t, i0, i1) for t in self._items}
+        top = heapq.nlargest(top_n, ((q, t) for t, q in qty.items() if q > 0)) if top_n > 0 else []
+        return {
+            "sales": float(round(self._rev[i1] - self._rev[i0], 2)),
+            "orders": self._cnt[i1] - self._cnt[i0],
+            "top_items": [{"title": t, "qty": q} for q, t in top],
+        }
+
+# key -> (label, first day of window given today)
+WINDOWS = {
+    "yesterday": ("Yesterdays Sales", lambda t: t - dt.timedelta(days=1)),
+    "7d":        ("Sales this week", lambda t: t - dt.timedelta(days=6)),
+    "30d":       ("Sales last 30 days", lambda t: t - dt.timedelta(days=29)),
+    "mtd":       ("Sales this month", lambda t: t.replace(day=1)),
+    "ytd":       ("Sales this year", lambda t: t.replace(month=1, day=1)),
+}
+
+def _window_keys() -> List[str]:
+    keys = [k.strip().lower() for k in (CFG.get("SHOPIFY_WINDOWS") or "").split(",") if k.strip()]
+    return [k for k in keys if k in WINDOWS] or ["yesterday", "7d"]
+
+def shopify_windows(roll: DailyRollup, today: dt.date, keys: List[str], top_n: int = 1) -> List[Dict[str, Any]]:
+    out = []
+    for k in keys:
+        label, first = WINDOWS[k]
+        last = today - dt.timedelta(days=1) if k == "yesterday" else today
+        w = roll.window(first(today), last, top_n)
+        out.append({"key": k, "label": label, **w})
+    return out
 
 # -------------------- public API --------------------
 
@@ -160,31 +400,48 @@ def get_shopify_last7_summary() -> Dict[str, Any]:
       {
         'yesterday_sales': float,  # ZAR, excl. shipping
         'gross_sales': float,      # last 7 days rolling, excl. shipping
-        'top_item': {'title': str, 'qty': int} | None
+        'top_item': {'title': str, 'qty': int} | None,
+        'top_items': [{'title': str, 'qty': int}, ...],   # last 7 days, SHOPIFY_TOP_N long
+        'windows': [{'key', 'label', 'sales', 'orders', 'top_items'}, ...]  # SHOPIFY_WINDOWS
       }
     """
     tz = CFG.get("TZ", "Africa/Johannesburg")
     za = pytz.timezone(tz)
     today = dt.datetime.now(za).date()
 
-    # Yesterday (00:00–23:59 local)
-    y0 = dt.datetime.combine(today - dt.timedelta(days=1), dt.time(0, 0, 0))
-    y1 = dt.datetime.combine(today - dt.timedelta(days=1), dt.time(23, 59, 59))
+    # stay inside the Shopify fetch deadline; a store still seeding covers the recent weeks first
+    store = sync_order_store(tz, seed_seconds=_seed_seconds())
+    covered = dt.date.fromisoformat(store["since"])
+    if covered > today - dt.timedelta(days=6):
+        raise RuntimeError(f"Shopify order store still seeding (complete from {covered})")
+    roll = DailyRollup.from_store(store, tz, today)
 
-    # Last 7 days window (rolling, up to now)
-    w0 = dt.datetime.combine(today - dt.timedelta(days=6), dt.time(0, 0, 0))
-    w1 = dt.datetime.now(za).replace(microsecond=0)
+    top_n = int(CFG.get("SHOPIFY_TOP_N") or 1)
+    keys = _window_keys()
+    skipped = [k for k in keys if WINDOWS[k][1](today) < covered]
+    if skipped:
+        print(f"[shopify] {', '.join(skipped)} left out: order store complete from {covered} only")
+        keys = [k for k in keys if k not in skipped]
+    windows = shopify_windows(roll, today, keys, top_n)
 
-    y_orders = _fetch_orders(_iso_utc(y0, tz), _iso_utc(y1, tz))
-    w_orders = _fetch_orders(_iso_utc(w0, tz), _iso_utc(w1, tz))
+    y = roll.window(today - dt.timedelta(days=1), today - dt.timedelta(days=1))
+    w = roll.window(today - dt.timedelta(days=6), today, top_n)
 
-    y_total = sum(_sum_order_subtotal(o) for o in y_orders)
-    w_total = sum(_sum_order_subtotal(o) for o in w_orders)
+    return {
+        "yesterday_sales": y["sales"],
+        "gross_sales": w["sales"],
+        "top_item": w["top_items"][0] if w["top_items"] else None,
+        "top_items": w["top_items"],
+        "windows": windows,
+    }
 
-    top_item = _pick_top_item(w_orders)
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Sync the local Shopify order store")
+    ap.add_argument("command", choices=["sync"])
+    args = ap.parse_args(argv)
+    store = sync_order_store()
+    print(f"[shopify] {args.command}: {len(store.get('orders') or {})} orders, complete from {store.get('since')}")
+    return 0
 
-    return {
-        "yesterday_sales": float(round(y_total, 2)),
-        "gross_sales": float(round(w_total, 2)),
-        "top_item": top_item,
-    }
\ No newline at end of file
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,43 @@
+# spoegwolf_daily/guest_table.py
+"""
+Purchase timestamps on guest rows, shared by sales_timing and tools/backfill_history.
+
+  local_seconds("2025-11-20 19:05:00", "Africa/Johannesburg")   # local wall-clock seconds since 1970
+
+Naive timestamps are already local (Quicket/iTickets report SAST); zoned ones are converted.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from datetime import datetime, date
+from typing import Any
+import pytz
+
+# First field present on the first row wins
+QUICKET_TS_FIELDS = ("PurchaseDate", "DatePurchased", "OrderDate", "DateAdded", "Created", "CreatedDate")
+ITICKETS_TS_FIELDS = ("purchase_date", "date_purchased", "order_date", "date", "Date", "created", "timestamp")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=8192)
+def _day_seconds(day: str) -> int:
+    return (date.fromisoformat(day) - date(1970, 1, 1)).days * 86400
+
+def local_seconds(ts: Any, tz_name: str) -> int:
+    """Timestamp -> local wall-clock seconds since 1970 (0 if unparseable). Naive = already local."""
+    s = (str(ts) if ts is not None else "").strip().replace("/", "-")
+    if len(s) < 10:
+        return 0
+    # fast path for the common naive 'YYYY-MM-DD HH:MM:SS' shape
+    if len(s) == 19 and s[13] == ":" and s[16] == ":":
+        try:
+            return _day_seconds(s[:10]) + int(s[11:13]) * 3600 + int(s[14:16]) * 60 + int(s[17:19])
+        except ValueError:
+            return 0
+    try:
+        dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    except ValueError:
+        return 0
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(pytz.timezone(tz_name)).replace(tzinfo=None)
+    return int((dt - _EPOCH).total_seconds())
@@ -0,0 +1,264 @@
+# spoegwolf_daily/httpclient.py
+"""
+One pooled requests.Session per source (plankton, quicket, shopify), shared by every
+caller in the process. Short runs pay the TLS handshake once per host instead of once per
+request; long-lived processes (--watch) keep the connections warm between polls.
+
+Optional on-disk response cache for development/reruns (off by default):
+  HTTP_CACHE=1      serve fresh-enough cached responses, fetch + store the rest
+  HTTP_CACHE=only   never touch the network; a miss is an error
+  HTTP_CACHE_TTL_<SOURCE>   seconds a response stays fresh (0 disables it for that source)
+Keys are sha256(method, full URL, credential/accept headers); secrets are only hashed.
+
+Record / replay (--record / --replay on main and cron_snapshot):
+  HTTP_RECORD=run.cassette.gz   append every request + response + timing as gzipped JSON lines
+  HTTP_REPLAY=run.cassette.gz   serve responses from a cassette instead of the network
+  HTTP_REPLAY_LATENCY=recorded|zero
+Replay matches on (source, method, URL) in recorded order; credential headers are never
+written and secret-looking query values are redacted, so cassettes can be shared. Sources
+still check their credentials exist before requesting, so set any placeholder values.
+"""
+from __future__ import annotations
+import os, re, gzip, json, time, atexit, base64, hashlib, threading
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .tracing import span
+
+_SESSIONS: Dict[Tuple[str, str], requests.Session] = {}
+_ADAPTERS: Dict[str, HTTPAdapter] = {}
+_LOCK = threading.Lock()
+
+CACHE_DIR = os.path.join(os.getenv("CACHE_DIR", "data/cache"), "http")
+DEFAULT_TTLS = {"plankton": 600, "quicket": 600, "itickets": 600, "shopify": 300}
+# Headers that change what a request returns (who is asking, in what format)
+_KEY_HEADERS = ("accept", "authorization", "cookie", "api_key", "usertoken", "x-shopify-access-token")
+
+_mode = (os.getenv("HTTP_CACHE") or "").strip().lower()
+_CACHE_ON = _mode in ("1", "true", "yes", "only")
+_CACHE_ONLY = _mode == "only"
+
+def configure_cache(enabled: bool = False, only: bool = False):
+    """Turn the response cache on from CLI flags (env HTTP_CACHE does the same)."""
+    global _CACHE_ON, _CACHE_ONLY
+    _CACHE_ON = _CACHE_ON or enabled or only
+    _CACHE_ONLY = _CACHE_ONLY or only
+
+def cache_only() -> bool:
+    return _CACHE_ONLY
+
+def _pool_size() -> int:
+    try:
+        return int(os.getenv("HTTP_POOL_SIZE", "8"))
+    except ValueError:
+        return 8
+
+def session(source: str) -> requests.Session:
+    """
+    One session per (source, tenant) so cookies never leak between tenants; all sessions of
+    a source share one adapter, i.e. one connection pool.
+    """
+    from .config import current_tenant
+    sid = (source, current_tenant().name)
+    with _LOCK:
+        s = _SESSIONS.get(sid)
+        if s is None:
+            adapter = _ADAPTERS.get(source)
+            if adapter is None:
+                adapter = _ADAPTERS[source] = HTTPAdapter(pool_connections=4, pool_maxsize=_pool_size())
+            s = requests.Session()
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _SESSIONS[sid] = s
+        return s
+
+# -------------------- response cache --------------------
+
+class CachedResponse:
+    """The slice of requests.Response our sources use, rebuilt from a cache/cassette entry."""
+
+    def __init__(self, entry: Dict[str, Any]):
+        self.url = entry["url"]
+        self.status_code = int(entry["status"])
+        self.reason = entry.get("reason") or "OK"
+        self.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        self.content = base64.b64decode(entry["body"])
+        self.from_cache = True
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        # cache entries are always 2xx; replayed ones can be recorded failures
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} {self.reason} for url: {self.url}", response=self)
+
+def _ttl(source: str) -> int:
+    v = os.getenv(f"HTTP_CACHE_TTL_{source.upper()}", "")
+    try:
+        return int(v) if v.strip() != "" else DEFAULT_TTLS.get(source, 300)
+    except ValueError:
+        return DEFAULT_TTLS.get(source, 300)
+
+def _key(method: str, url: str, headers: Optional[Dict[str, str]]) -> str:
+    h = sorted((k.lower(), str(v)) for k, v in (headers or {}).items() if k.lower() in _KEY_HEADERS)
+    blob = json.dumps([method.upper(), url, h], separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def _path(source: str, key: str) -> str:
+    return os.path.join(CACHE_DIR, source, f"{key}.json")
+
+def _lookup(source: str, key: str) -> Optional[Dict[str, Any]]:
+    p = _path(source, key)
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    # cache-only serves anything we have, however old
+    if not _CACHE_ONLY and time.time() - float(entry.get("ts") or 0) > _ttl(source):
+        return None
+    return entry
+
+def _store(source: str, key: str, entry: Dict[str, Any]):
+    p = _path(source, key)
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = f"{p}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp, p)
+
+def _miss(source: str, url: str):
+    raise RuntimeError(f"cache-only: no cached {source} response for {redact(url)}")
+
+_SECRET_PARAM = re.compile(r"([?&](?:[^=&]*(?:key|token|secret|auth|pass|sig)[^=&]*)=)[^&]*", re.I)
+
+def redact(url: str) -> str:
+    """Blank out query values whose names look like credentials (feed URLs carry their key)."""
+    return _SECRET_PARAM.sub(r"\1REDACTED", url)
+
+def _entry(url: str, status: int, reason: str, headers: Dict[str, str], body: bytes) -> Dict[str, Any]:
+    return {"ts": time.time(), "url": redact(url), "status": status, "reason": reason,
+            "headers": {k: v for k, v in headers.items() if k.lower() != "set-cookie"},
+            "body": base64.b64encode(body).decode("ascii")}
+
+# -------------------- record / replay --------------------
+
+_REC: Dict[str, Any] = {}                                  # {"file", "lock", "t0"} while recording
+_REPLAY: Optional[Dict[Tuple[str, str, str], deque]] = None
+_REPLAY_LATENCY = "zero"
+
+def start_recording(path: str):
+    f = gzip.open(path, "wt", encoding="utf-8")
+    _REC.update({"file": f, "lock": threading.Lock(), "t0": time.perf_counter()})
+    atexit.register(stop_recording)
+    print(f"[http] recording to {path}")
+
+def stop_recording():
+    f = _REC.pop("file", None)
+    _REC.clear()
+    if f is not None:
+        f.close()
+
+def _record(source: str, method: str, url: str, entry: Dict[str, Any], started: float, elapsed: float):
+    line = dict(entry, source=source, method=method, url=redact(url),
+                t=round(started - _REC["t0"], 6), elapsed=round(elapsed, 6))
+    line.pop("ts", None)
+    with _REC["lock"]:
+        _REC["file"].write(json.dumps(line, separators=(",", ":")) + "\n")
+
+def start_replay(path: str, latency: str = "zero"):
+    global _REPLAY, _REPLAY_LATENCY
+    _REPLAY, _REPLAY_LATENCY = {}, latency
+    n = 0
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            it = json.loads(line)
+            _REPLAY.setdefault((it["source"], it["method"], it["url"]), deque()).append(it)
+            n += 1
+    print(f"[http] replaying {n} interactions from {path} (latency: {latency})")
+
+def replaying() -> bool:
+    return _REPLAY is not None
+
+def _replayed(source: str, method: str, url: str) -> Dict[str, Any]:
+    q = (_REPLAY or {}).get((source, method, redact(url)))
+    if not q:
+        raise RuntimeError(f"replay: no recorded {source} {method} {redact(url)}")
+    it = q.popleft() if len(q) > 1 else q[0]   # repeat the last answer once exhausted
+    if _REPLAY_LATENCY == "recorded" and it.get("elapsed"):
+        time.sleep(float(it["elapsed"]))
+    return it
+
+def configure_from_args(record: Optional[str] = None, replay: Optional[str] = None, latency: str = "zero"):
+    """Shared CLI hook for main / cron_snapshot; env HTTP_RECORD / HTTP_REPLAY work too."""
+    replay = replay or os.getenv("HTTP_REPLAY")
+    record = record or os.getenv("HTTP_RECORD")
+    if replay:
+        start_replay(replay, os.getenv("HTTP_REPLAY_LATENCY", latency))
+    elif record:
+        start_recording(record)
+
+# -------------------- entry points --------------------
+
+def get(source: str, url: str, **kwargs):
+    with span("http.get", source=source):
+        return _get(source, url, **kwargs)
+
+def _get(source: str, url: str, **kwargs):
+    use_cache = _CACHE_ON and (_ttl(source) > 0 or _CACHE_ONLY)
+    if not (use_cache or _REC or _REPLAY is not None):
+        return session(source).get(url, **kwargs)
+
+    full_url = requests.Request("GET", url, params=kwargs.get("params")).prepare().url
+    if _REPLAY is not None:
+        return CachedResponse(_replayed(source, "GET", full_url))
+
+    started = time.perf_counter()
+    key = _key("GET", full_url, kwargs.get("headers"))
+    entry = _lookup(source, key) if use_cache else None
+    if entry is not None:
+        resp = CachedResponse(entry)
+    elif _CACHE_ONLY:
+        _miss(source, full_url)
+    else:
+        r = session(source).get(url, **kwargs)
+        entry = _entry(full_url, r.status_code, r.reason, dict(r.headers), r.content)
+        if use_cache and r.ok:
+            _store(source, key, entry)
+        resp = r
+    if _REC:
+        _record(source, "GET", full_url, entry, started, time.perf_counter() - started)
+    return resp
+
+def fetch_text(source: str, url: str, fetch: Callable[[], str]) -> str:
+    """Cache / record / replay wrapper for non-requests fetchers (the iTickets curl call)."""
+    use_cache = _CACHE_ON and (_ttl(source) > 0 or _CACHE_ONLY)
+    if not (use_cache or _REC or _REPLAY is not None):
+        return fetch()
+    if _REPLAY is not None:
+        return CachedResponse(_replayed(source, "GET", url)).text
+
+    started = time.perf_counter()
+    key = _key("GET", url, None)
+    entry = _lookup(source, key) if use_cache else None
+    if entry is None:
+        if _CACHE_ONLY:
+            _miss(source, url)
+        entry = _entry(url, 200, "OK", {}, fetch().encode("utf-8"))
+        if use_cache:
+            _store(source, key, entry)
+    if _REC:
+        _record(source, "GET", url, entry, started, time.perf_counter() - started)
+    return CachedResponse(entry).text
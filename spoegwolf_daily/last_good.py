@@ -0,0 +1,113 @@
+# spoegwolf_daily/last_good.py
+"""
+Deadline-bounded fetching with a last-known-good fallback.
+
+Every source fetch runs on the shared scheduler pool and gets a budget measured from the start of the
+run (DEADLINE_<SOURCE> seconds). Each successful result is written to
+data/cache/last_good/<key>.json. If a fetch fails or misses its deadline, the caller gets the
+last good result marked with when it was fetched, and a late fetch that still finishes
+refreshes the file for the next run (the worker keeps going in the background).
+"""
+from __future__ import annotations
+import os, re, json, time
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Tuple
+import pytz
+
+from .config import namespaced
+from .scheduler import submit
+from .tracing import span
+
+CACHE_DIR = os.getenv("CACHE_DIR", "data/cache")
+DEFAULT_DEADLINES = {"plankton": 30, "quicket": 90, "itickets": 45, "shopify": 60}
+
+
+def deadline(source: str) -> float:
+    try:
+        return float(os.getenv(f"DEADLINE_{source.upper()}", DEFAULT_DEADLINES.get(source, 60)))
+    except ValueError:
+        return float(DEFAULT_DEADLINES.get(source, 60))
+
+def _path(key: str) -> str:
+    return os.path.join(namespaced(os.path.join(CACHE_DIR, "last_good")), re.sub(r"[^\w.-]", "_", key) + ".json")
+
+def save_last_good(key: str, value: Any):
+    _write(_path(key), value)
+
+def _write(p: str, value: Any):
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = p + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"saved_at": time.time(), "value": value}, f, ensure_ascii=False, default=str)
+    os.replace(tmp, p)
+
+def load_last_good(key: str) -> Optional[Tuple[Any, float]]:
+    """(value, saved_at epoch) or None."""
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f:
+            js = json.load(f)
+        return js["value"], float(js["saved_at"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+def age_label(saved_at: float, tz: str) -> str:
+    """'23h50', or '17/11 23h50' when it is not from today or last night.
+    No colon: the HTML mail treats lines with ':' as 'label: value', not show names."""
+    zone = pytz.timezone(tz)
+    when = datetime.fromtimestamp(saved_at, zone)
+    if time.time() - saved_at < 86400:
+        return when.strftime("%Hh%M")
+    return when.strftime("%d/%m %Hh%M")
+
+
+def _saver(key: str):
+    p = _path(key)  # resolved now: callbacks run outside the caller's tenant context
+    def done(fut):
+        if fut.cancelled() or fut.exception() is not None:
+            return
+        if fut.result() is not None:
+            _write(p, fut.result())
+    return done
+
+def _traced_fetch(key: str, fetch: Callable[[], Any]) -> Any:
+    with span("fetch", key=key):
+        return fetch()
+
+def fetch_all(jobs: List[Tuple[str, str, Callable[[], Any]]],
+              blocked: Optional[Dict[str, str]] = None) -> Dict[str, Tuple[Any, Optional[float]]]:
+    """
+    jobs: (key, source, fetch). All fetches start at once.
+    Returns {key: (value, None)} for fresh results, {key: (value, saved_at)} for last-good
+    fallbacks and {key: (None, None)} when a source failed and nothing was ever saved.
+    blocked: preflight problems ({source or key: reason}); those jobs are not started at all.
+    """
+    if not jobs:
+        return {}
+    blocked = blocked or {}
+    started = time.monotonic()
+    futures = []
+    out: Dict[str, Tuple[Any, Optional[float]]] = {}
+    for key, source, fetch in jobs:
+        if source in blocked or key in blocked:
+            print(f"[last_good] {key} not fetched (preflight: {blocked.get(key) or blocked[source]})")
+            cached = load_last_good(key)
+            out[key] = cached if cached is not None else (None, None)
+            continue
+        # late fetches keep running on the pool and refresh the last-good file
+        fut = submit(source, _traced_fetch, key, fetch)
+        fut.add_done_callback(_saver(key))
+        futures.append((key, source, fut))
+
+    for key, source, fut in futures:
+        budget = deadline(source)
+        try:
+            out[key] = (fut.result(timeout=max(0.0, started + budget - time.monotonic())), None)
+            continue
+        except FutureTimeout:
+            print(f"[last_good] {key} missed its {budget:g}s deadline; refreshing in the background")
+        except Exception as e:
+            print(f"[last_good] {key} failed: {e}")
+        cached = load_last_good(key)
+        out[key] = cached if cached is not None else (None, None)
+    return out
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import pytz
 
 from .config import CFG, SHOWS, QUICKET_EVENTS, ITICKETS_EVENTS
@@ -11,12 +11,16 @@ from .data_sources.quicket import (
     summarize_event as quicket_summarize,
     get_event_date_first_page,
 )
-from .data_sources.itickets import fetch_itickets_csv_via_curl, summarize_itickets_total
+from .data_sources.itickets import summarize_itickets_feed
 import os
 from .data_sources.shopify import get_shopify_last7_summary
 from .summarize_af import build_message
-from .senders.emailer import send_email_summary
-from .snapshot_store import yesterday_delta
+from .senders.emailer import send_email_summary, _text_to_html
+from .snapshot_store import yesterday_delta, yesterday_group_delta, week_over_week
+from .report_cache import report_key, load_report, store_report, mark_sent
+from .last_good import fetch_all, age_label
+from . import httpclient, preflight, sales_timing
+from .archive import load_archive, archive_block, archived_block, is_finished, hide_archived
 
 
 # ---------- helpers ----------
@@ -49,6 +53,18 @@ def _days_to_event_from_eventdate(eventdate_iso: Optional[str], tz_name: str) ->
     except Exception:
         return None
 
+def _week(key: str, tz_name: str) -> Optional[List[Optional[int]]]:
+    """[this week, last week] from the snapshot rollups when SUMMARY_WEEK_LINE is on."""
+    if CFG.get("SUMMARY_WEEK_LINE", "0").strip().lower() not in ("1", "true", "yes"):
+        return None
+    return list(week_over_week(key, tz_name))
+
+def _timing(key: str) -> Optional[Dict[str, int]]:
+    """Busiest weekday/hour from the sales-timing histograms when SUMMARY_TIMING_LINE is on."""
+    if CFG.get("SUMMARY_TIMING_LINE", "0").strip().lower() not in ("1", "true", "yes"):
+        return None
+    return sales_timing.peak(key)
+
 def _days_to(date_obj, tz_name: str) -> Optional[int]:
     if not date_obj:
         return None
@@ -57,143 +73,220 @@ def _days_to(date_obj, tz_name: str) -> Optional[int]:
 # --------------------------------
 
 
-def generate_summary_text() -> str:
+def plankton_block(show: Dict[str, Any], tz: str) -> Dict[str, Any]:
+    js = get_event_summary(show["event_guid"])
+    tinfo = js.get("TicketInfo", [])
+
+    groups = show.get("groups", {})
+    ga   = _sum_by_names(tinfo, groups.get("GA (Adults)"))
+    kids = _sum_by_names(tinfo, groups.get("Kids Tickets"))
+    goue = _sum_by_names(tinfo, groups.get("Goue Kraal"))
+    total_included = ga + kids + goue
+
+    yday_delta = yesterday_delta(show["event_guid"], tz)
+    days_to = _days_to_event_from_eventdate(js.get("EventDate"), tz)
+
+    return {
+        "name": show["name"],
+        "capacity": int(show.get("capacity", 0)),
+        "ga": ga,
+        "kids": kids,
+        "goue": goue,
+        "total": total_included,
+        "yesterday": yday_delta,
+        "yesterday_groups": yesterday_group_delta(show["event_guid"], tz),
+        "week": _week(show["event_guid"], tz),
+        "days_to_event": days_to,
+    }
+
+
+def quicket_block(ev: Dict[str, Any], tz: str, sums: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    ev_id = int(ev["id"])
+    groups = ev.get("groups", {})
+
+    # live counts (callers that already hold them, e.g. the watcher, pass sums in)
+    if sums is None:
+        sums = quicket_summarize(ev_id, groups)  # adults, kids, total, ...
+    adults = int(sums["adults"])
+    kids = int(sums["kids"])
+    total_included = int(sums["total"])
+
+    # yesterday from nightly snapshots (namespaced key)
+    yday = yesterday_delta(f"quicket:{ev_id}", tz)
+
+    # event date: prefer manual override date-only, else cheap first-page probe
+    qdate = None
+    override_date = ev.get("event_date_date")  # "YYYY-MM-DD"
+    if override_date:
+        try:
+            qdate = datetime.strptime(override_date, "%Y-%m-%d").date()
+        except Exception:
+            qdate = None
+    if qdate is None:
+        qdate = get_event_date_first_page(ev_id, tz)  # returns date or None
+
+    return {
+        "name": ev["name"],
+        "capacity": int(ev.get("capacity", 0)),
+        "ga": adults,
+        "kids": kids,
+        "goue": 0,                 # keep field for unified formatter
+        "total": total_included,
+        "yesterday": yday,
+        "yesterday_groups": yesterday_group_delta(f"quicket:{ev_id}", tz),
+        "week": _week(f"quicket:{ev_id}", tz),
+        "timing": _timing(f"quicket:{ev_id}"),
+        "days_to_event": _days_to(qdate, tz),
+    }
+
+
+def itickets_feed_url(ev: Dict[str, Any]) -> str:
+    url = os.getenv(ev["feed_url_env"], "")
+    if not url:
+        raise RuntimeError(f"Missing env var for iTickets feed URL: {ev['feed_url_env']}")
+    return url
+
+
+def itickets_block(ev: Dict[str, Any], tz: str, sums: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    eid = str(ev["eid"])
+
+    if sums is None:
+        sums = summarize_itickets_feed(itickets_feed_url(ev))
+
+    normal = int(sums["normal"])
+    vip = int(sums["vip"])
+    total = int(sums["total_sold"])
+
+    yday = yesterday_delta(f"itickets:{eid}", tz)
+
+    # days to event (manual override date-only)
+    dte = None
+    if ev.get("event_date_date"):
+        try:
+            d = datetime.strptime(ev["event_date_date"], "%Y-%m-%d").date()
+            dte = _days_to(d, tz)
+        except Exception:
+            dte = None
+
+    return {
+        "name": ev["name"],
+        "capacity": int(ev.get("capacity", 0)),
+        "normal": normal,
+        "vip": vip,
+        "total": total,
+        "yesterday": yday,
+        "yesterday_groups": yesterday_group_delta(f"itickets:{eid}", tz),
+        "week": _week(f"itickets:{eid}", tz),
+        "timing": _timing(f"itickets:{eid}"),
+        "days_to_event": dte,
+    }
+
+
+def _fallback(block: Optional[Dict[str, Any]], saved_at: Optional[float], ev: Dict[str, Any],
+              key: str, tz: str) -> Dict[str, Any]:
+    """Last-good block with an age marker, snapshot-derived fields refreshed; placeholder if none."""
+    if block is None:
+        return {"name": ev["name"], "capacity": int(ev.get("capacity", 0)), "unavailable": True}
+    block = dict(block, stale=age_label(saved_at, tz),
+                 yesterday=yesterday_delta(key, tz), yesterday_groups=yesterday_group_delta(key, tz),
+                 week=_week(key, tz), timing=_timing(key))
+    if block.get("days_to_event") is not None:
+        saved_day = datetime.fromtimestamp(saved_at, pytz.timezone(tz)).date()
+        block["days_to_event"] += _days_to(saved_day, tz)  # minus the days since it was saved
+    return block
+
+
+def collect_inputs() -> Dict[str, Any]:
     """
-    Build the full summary without sending email.
-    Read-only: uses snapshots for 'Gister se verkope'.
+    Fetch every source and return the build_message inputs (no rendering).
+    Uses snapshots for 'Gister se verkope'; the only write is archiving a finished event.
+    Sources run concurrently within their DEADLINE_<SOURCE> budgets; a source that fails or
+    runs late is shown from its last good fetch (see last_good.py) so the email still goes out.
+    A source whose credentials or feed URL fail the preflight is not fetched at all.
+    Archived (finished) events come from their archive record and are never fetched.
     """
     tz = CFG["TZ"]
-
-    # -------- Plankton blocks --------
-    blocks = []
-    for show in SHOWS:
-        js = get_event_summary(show["event_guid"])
-        tinfo = js.get("TicketInfo", [])
-
-        groups = show.get("groups", {})
-        ga   = _sum_by_names(tinfo, groups.get("GA (Adults)"))
-        kids = _sum_by_names(tinfo, groups.get("Kids Tickets"))
-        goue = _sum_by_names(tinfo, groups.get("Goue Kraal"))
-        total_included = ga + kids + goue
-
-        yday_delta = yesterday_delta(show["event_guid"], tz)
-        days_to = _days_to_event_from_eventdate(js.get("EventDate"), tz)
-
-        blocks.append({
-            "name": show["name"],
-            "capacity": int(show.get("capacity", 0)),
-            "ga": ga,
-            "kids": kids,
-            "goue": goue,
-            "total": total_included,
-            "yesterday": yday_delta,
-            "days_to_event": days_to,
-        })
-
-    # -------- Quicket blocks --------
-    quicket_blocks = []
-    if QUICKET_EVENTS:
-        for ev in QUICKET_EVENTS:
-            ev_id = int(ev["id"])
-            name = ev["name"]
-            capacity = int(ev.get("capacity", 0))
-            groups = ev.get("groups", {})
-
-            # live counts
-            sums = quicket_summarize(ev_id, groups)  # adults, kids, total, ...
-            adults = int(sums["adults"])
-            kids = int(sums["kids"])
-            total_included = int(sums["total"])
-
-            # yesterday from nightly snapshots (namespaced key)
-            yday = yesterday_delta(f"quicket:{ev_id}", tz)
-
-            # event date: prefer manual override date-only, else cheap first-page probe
-            qdate = None
-            override_date = ev.get("event_date_date")  # "YYYY-MM-DD"
-            if override_date:
-                try:
-                    qdate = datetime.strptime(override_date, "%Y-%m-%d").date()
-                except Exception:
-                    qdate = None
-            if qdate is None:
-                qdate = get_event_date_first_page(ev_id, tz)  # returns date or None
-
-            days_to = _days_to(qdate, tz)
-
-            quicket_blocks.append({
-                "name": name,
-                "capacity": capacity,
-                "ga": adults,
-                "kids": kids,
-                "goue": 0,                 # keep field for unified formatter
-                "total": total_included,
-                "yesterday": yday,
-                "days_to_event": days_to,
-            })
-
-    # -------- iTickets blocks --------
-    itickets_blocks = []
-    for ev in ITICKETS_EVENTS:
-        eid = str(ev["eid"])
-        name = ev["name"]
-        capacity = int(ev.get("capacity", 0))
-
-        url = os.getenv(ev["feed_url_env"], "")
-        if not url:
-            raise RuntimeError(f"Missing env var for iTickets feed URL: {ev['feed_url_env']}")
-
-        rows = fetch_itickets_csv_via_curl(url)
-        sums = summarize_itickets_total(rows)
-
-        normal = int(sums["normal"])
-        vip = int(sums["vip"])
-        total = int(sums["total_sold"])
-
-        yday = yesterday_delta(f"itickets:{eid}", tz)
-
-        # days to event (manual override date-only)
-        dte = None
-        if ev.get("event_date_date"):
-            try:
-                d = datetime.strptime(ev["event_date_date"], "%Y-%m-%d").date()
-                dte = _days_to(d, tz)
-            except Exception:
-                dte = None
-
-        itickets_blocks.append({
-            "name": name,
-            "capacity": capacity,
-            "normal": normal,
-            "vip": vip,
-            "total": total,
-            "yesterday": yday,
-            "days_to_event": dte,
-        })
-
-    # -------- Shopify --------
-    shop = None
+    archived = {}
+    for key in ([s["event_guid"] for s in SHOWS] + [f"quicket:{e['id']}" for e in QUICKET_EVENTS]
+                + [f"itickets:{e['eid']}" for e in ITICKETS_EVENTS]):
+        rec = load_archive(key)
+        if rec is not None:
+            archived[key] = rec
+
+    jobs = [(f"plankton:{show['event_guid']}", "plankton", lambda show=show: plankton_block(show, tz))
+            for show in SHOWS if show["event_guid"] not in archived]
+    jobs += [(f"quicket:{ev['id']}", "quicket", lambda ev=ev: quicket_block(ev, tz))
+             for ev in QUICKET_EVENTS if f"quicket:{ev['id']}" not in archived]
+    jobs += [(f"itickets:{ev['eid']}", "itickets", lambda ev=ev: itickets_block(ev, tz))
+             for ev in ITICKETS_EVENTS if f"itickets:{ev['eid']}" not in archived]
     if CFG.get("SHOPIFY_BASE") and CFG.get("SHOPIFY_ACCESS_TOKEN"):
-        try:
-            shop = get_shopify_last7_summary()
-        except Exception as e:
-            # Non-fatal: still build the rest
-            print(f"[WARN] Shopify fetch failed: {e}")
+        jobs.append(("shopify", "shopify", get_shopify_last7_summary))
+    results = fetch_all(jobs, preflight.check())
+
+    def blocks(events, prefix, id_field, snap_key):
+        out = []
+        for ev in events:
+            key = snap_key(ev)
+            if key in archived:
+                if not hide_archived():
+                    out.append(archived_block(archived[key], ev))
+                continue
+            block, saved_at = results[f"{prefix}:{ev[id_field]}"]
+            if block is not None and saved_at is None:
+                if is_finished(block.get("days_to_event")) and not httpclient.replaying():
+                    archive_block(key, prefix, block, tz)
+                out.append(block)
+            else:
+                out.append(_fallback(block, saved_at, ev, key, tz))
+        return out
+
+    # -------- Shopify (optional) --------
+    shop, saved_at = results.get("shopify", (None, None))
+    if shop is not None and saved_at is not None:
+        shop = dict(shop, stale=age_label(saved_at, tz))
+
+    return {
+        "shows_blocks": blocks(SHOWS, "plankton", "event_guid", lambda ev: ev["event_guid"]),
+        "tz": tz,
+        "shopify": shop,
+        "quicket": blocks(QUICKET_EVENTS, "quicket", "id", lambda ev: f"quicket:{ev['id']}") or None,
+        "itickets": blocks(ITICKETS_EVENTS, "itickets", "eid", lambda ev: f"itickets:{ev['eid']}") or None,
+    }
+
+
+def _render(inputs: Dict[str, Any], force: bool = False) -> Tuple[str, Dict[str, Any]]:
+    """
+    Render text + HTML, reusing the cached report when the inputs hash is unchanged.
+    Returns (hash key, cache entry).
+    """
+    key = report_key(inputs)
+    entry = None if force else load_report(key)
+    if entry is not None:
+        print(f"[report] inputs unchanged ({key[:12]}); reusing rendered report")
+        return key, entry
+    text = build_message(**inputs)
+    return key, store_report(key, text, _text_to_html(text))
+
 
-    # -------- Build final message --------
-    msg = build_message(blocks, tz=tz, shopify=shop, quicket=quicket_blocks or None, itickets=itickets_blocks or None)
-    return msg
+def generate_summary_text(force: bool = False) -> str:
+    """Build the full summary without sending email."""
+    _, entry = _render(collect_inputs(), force=force)
+    return entry["text"]
 
 
-def run():
-    """Normal run: generate + email."""
-    msg = generate_summary_text()
+def run(force: bool = False):
+    """Normal run: generate + email (skipped if this exact report was already sent)."""
+    key, entry = _render(collect_inputs(), force=force)
     # You can keep a fixed subject to keep a single thread; or include date.
     # subject = "Spoegwolf Daaglikse Opsomming"
     # If you prefer date in subject:
     now = datetime.now(pytz.timezone(CFG["TZ"]))
-    subject = f"Spoegwolf Daaglikse Opsomming — {now.strftime('%A, %d %B %Y')}"
-    send_email_summary(subject, msg)
+    subject = f"{CFG.get('REPORT_TITLE') or 'Spoegwolf'} Daaglikse Opsomming — {now.strftime('%A, %d %B %Y')}"
+    if not force and subject in entry.get("sent", []):
+        print("[report] identical report already sent; skipping email (use --force to resend)")
+        return
+    send_email_summary(subject, entry["text"], html_body=entry["html"])
+    mark_sent(key, subject)
 
 
 if __name__ == "__main__":
@@ -201,9 +294,40 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Spoegwolf Daily Summary")
     parser.add_argument("--no-email", action="store_true",
                         help="Generate and print the summary without sending email (testing mode)")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-render and re-send even if the report inputs are unchanged")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse recent API responses from data/cache/http (per-source TTLs)")
+    parser.add_argument("--cache-only", action="store_true",
+                        help="Serve API responses from the local cache only; never touch the network")
+    parser.add_argument("--record", metavar="CASSETTE",
+                        help="Record every API request/response with timings to a gzipped cassette")
+    parser.add_argument("--replay", metavar="CASSETTE",
+                        help="Serve API responses from a recorded cassette instead of the network")
+    parser.add_argument("--replay-latency", choices=["zero", "recorded"], default="zero",
+                        help="Replay instantly or at the recorded per-request latency")
+    parser.add_argument("--trace", metavar="OUT_JSON",
+                        help="Write a Chrome/Perfetto trace of the run (open in ui.perfetto.dev)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Stay running: poll sources on their own intervals, log intraday points, email alerts")
+    parser.add_argument("--tenants", metavar="FILE",
+                        help="Run every tenant in this JSON file (default: env TENANTS_FILE, else just this .env)")
     args = parser.parse_args()
 
-    if args.no_email:
-        print(generate_summary_text())
+    from . import tracing
+    tracing.configure_from_args(args.trace)
+    httpclient.configure_from_args(args.record, args.replay, args.replay_latency)
+    if args.cache or args.cache_only:
+        httpclient.configure_cache(enabled=args.cache, only=args.cache_only)
+    from .config import load_tenants
+    from .scheduler import for_each_tenant
+    tenants = load_tenants(args.tenants)
+    if args.watch:
+        from .watch import run_watch
+        raise SystemExit(run_watch(tenants))
+    if args.no_email or args.replay:  # a replayed run never emails
+        job = lambda: print(generate_summary_text(force=args.force))
     else:
-        run()
\ No newline at end of file
+        job = lambda: run(force=args.force)
+    results = for_each_tenant(tenants, job)
+    raise SystemExit(1 if any(isinstance(r, Exception) for r in results.values()) else 0)
\ No newline at end of file
@@ -0,0 +1,59 @@
+# spoegwolf_daily/parse_pool.py
+"""
+Optional process pool for the CPU-bound half of big fetches (JSON decoding, CSV parsing,
+row classification), which is otherwise serialized by the GIL.
+
+PARSE_WORKERS=N (or "auto" = one per spare core; default 0 = off) starts the workers on
+first use. Payloads below PARSE_POOL_MIN_BYTES (default 4 MB) are always parsed in-process,
+so small events never pay for worker startup. Workers receive raw page bytes or CSV chunks
+and send back compact count dicts only, never row dicts.
+"""
+from __future__ import annotations
+import os, atexit, threading, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, Any, Callable, Iterable
+
+_POOL = None
+_LOCK = threading.Lock()
+
+
+def workers() -> int:
+    v = (os.getenv("PARSE_WORKERS") or "0").strip().lower()
+    if v == "auto":
+        return max(1, (os.cpu_count() or 2) - 1)
+    try:
+        return max(0, int(v))
+    except ValueError:
+        return 0
+
+def min_bytes() -> int:
+    try:
+        return int(os.getenv("PARSE_POOL_MIN_BYTES", str(4 * 1024 * 1024)))
+    except ValueError:
+        return 4 * 1024 * 1024
+
+def worth_it(nbytes: int) -> bool:
+    """True when the pool is on and a payload of this size should go to it."""
+    return workers() > 0 and nbytes >= min_bytes()
+
+def pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            # forkserver/spawn: forking a process that runs fetch threads can copy held locks
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _POOL = ProcessPoolExecutor(max_workers=workers(), mp_context=ctx)
+            atexit.register(_POOL.shutdown, cancel_futures=True)
+        return _POOL
+
+def submit(fn: Callable, *args) -> Future:
+    return pool().submit(fn, *args)
+
+def merge_counts(parts: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """Sum partial count dicts key by key."""
+    out: Dict[str, int] = {}
+    for part in parts:
+        for k, v in part.items():
+            out[k] = out.get(k, 0) + int(v)
+    return out
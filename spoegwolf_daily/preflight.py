@@ -0,0 +1,167 @@
+# spoegwolf_daily/preflight.py
+"""
+Cheap credential and reachability checks, run concurrently before any expensive scan.
+
+  problems = check()        # {"quicket": "credentials rejected (401)", "itickets:485051": "..."}
+
+One request per source: a Plankton summary for the first show, a one-row Quicket guest page,
+the first KB of each iTickets feed (a bad key is a 200 with an error body), a one-order Shopify page. Missing env vars/secrets fail
+without a request. Keys are sources, or job keys ("itickets:<eid>") for per-event problems,
+matching last_good.fetch_all job keys. The morning run shows blocked sources from their last
+good fetch straight away; cron_snapshot skips them and exits 1 after snapshotting the rest.
+
+A pass is remembered for PREFLIGHT_TTL seconds (default 600) in data/cache/preflight/, keyed
+by a hash of the credentials, so reruns within minutes don't re-check; failures are never cached.
+Every check shares PREFLIGHT_TIMEOUT (default 5 s); a source still silent then counts as
+unreachable. PREFLIGHT=0 turns it off; replay and cache-only runs skip it (no network).
+"""
+from __future__ import annotations
+import os, json, time, hashlib
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, List, Optional, Callable, Tuple
+import requests
+
+from .config import CFG, SHOWS, QUICKET_EVENTS, ITICKETS_EVENTS, namespaced
+from . import httpclient
+from .scheduler import submit
+
+CACHE_DIR = os.path.join(os.getenv("CACHE_DIR", "data/cache"), "preflight")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def enabled() -> bool:
+    if (os.getenv("PREFLIGHT") or "1").strip().lower() in ("0", "false", "no"):
+        return False
+    return not (httpclient.replaying() or httpclient.cache_only())
+
+def _timeouts() -> Tuple[float, float]:
+    t = _env_float("PREFLIGHT_TIMEOUT", 5.0)
+    return (min(3.0, t), t)
+
+# -------------------- positive cache --------------------
+
+def _path(key: str) -> str:
+    return os.path.join(namespaced(CACHE_DIR), key.replace(":", "_") + ".json")
+
+def _sig(*secrets: Optional[str]) -> str:
+    return hashlib.sha256("\0".join(s or "" for s in secrets).encode("utf-8")).hexdigest()
+
+def _passed_recently(key: str, sig: str) -> bool:
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f:
+            js = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return js.get("sig") == sig and time.time() - float(js.get("ok_at") or 0) < _env_float("PREFLIGHT_TTL", 600)
+
+def _remember(key: str, sig: str):
+    p = _path(key)
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = f"{p}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"sig": sig, "ok_at": time.time()}, f)
+    os.replace(tmp, p)
+
+# -------------------- checks --------------------
+# each returns None when fine, else a short reason
+
+def _verdict(r) -> Optional[str]:
+    if r.status_code in (401, 403):
+        return f"credentials rejected ({r.status_code})"
+    if r.status_code >= 500:
+        return f"server error ({r.status_code})"
+    return None
+
+def _check_plankton() -> Optional[str]:
+    from .data_sources.plankton import BASE, _headers
+    r = httpclient.session("plankton").get(f"{BASE}/api/v2/events/summary/{SHOWS[0]['event_guid']}",
+                                           headers=_headers(), timeout=_timeouts())
+    return _verdict(r)
+
+def _check_quicket() -> Optional[str]:
+    from .data_sources.quicket import BASE, _headers
+    r = httpclient.session("quicket").get(f"{BASE}/api/events/{QUICKET_EVENTS[0]['id']}/guests?page=1&pagesize=1",
+                                          headers=_headers(), timeout=_timeouts())
+    return _verdict(r)
+
+def _check_itickets(url: str) -> Optional[str]:
+    from .data_sources.itickets import feed_problem
+    with httpclient.session("itickets").get(url, headers={"Range": "bytes=0-1023"}, stream=True,
+                                            timeout=_timeouts(), allow_redirects=True) as r:
+        if r.status_code == 404:
+            return "feed not found (404)"
+        bad = _verdict(r)
+        if bad:
+            return bad
+        # servers that ignore Range send the whole feed: read one chunk and hang up
+        head = next(r.iter_content(1024), b"").decode("utf-8", errors="replace")
+    return feed_problem(head)
+
+def _check_shopify() -> Optional[str]:
+    from .data_sources.shopify import _orders_url, _headers
+    r = httpclient.session("shopify").get(_orders_url(), headers=_headers(), params={"limit": 1, "fields": "id"},
+                                          timeout=_timeouts())
+    return _verdict(r)
+
+def _checks() -> List[Tuple[str, str, str, Callable[[], Optional[str]]]]:
+    """(key, source, credential signature, check) for everything configured."""
+    out = []
+    if SHOWS:
+        out.append(("plankton", "plankton", _sig(CFG.get("PLANKTON_AUTH"), CFG.get("PLANKTON_COOKIE")), _check_plankton))
+    if QUICKET_EVENTS:
+        out.append(("quicket", "quicket", _sig(CFG.get("QUICKET_API_KEY"), CFG.get("QUICKET_USERTOKEN")), _check_quicket))
+    for ev in ITICKETS_EVENTS:
+        url = os.getenv(ev["feed_url_env"], "")
+        key = f"itickets:{ev['eid']}"
+        if not url:
+            out.append((key, "itickets", "", lambda ev=ev: f"missing env var {ev['feed_url_env']}"))
+        else:
+            out.append((key, "itickets", _sig(url), lambda url=url: _check_itickets(url)))
+    if CFG.get("SHOPIFY_BASE") or CFG.get("SHOPIFY_ACCESS_TOKEN"):
+        out.append(("shopify", "shopify", _sig(CFG.get("SHOPIFY_BASE"), CFG.get("SHOPIFY_ACCESS_TOKEN")), _check_shopify))
+    return out
+
+def _run(fn: Callable[[], Optional[str]]) -> Optional[str]:
+    try:
+        return fn()
+    except RuntimeError as e:  # the sources' own "Missing ... in .env" errors
+        return str(e)
+    except requests.RequestException as e:
+        return f"unreachable ({type(e).__name__})"
+    except Exception as e:
+        return f"check failed: {e}"
+
+def check() -> Dict[str, str]:
+    """Run every configured check concurrently; {key: reason} for the ones that failed."""
+    if not enabled():
+        return {}
+    started = time.monotonic()
+    budget = _env_float("PREFLIGHT_TIMEOUT", 5.0) + 1.0
+    pending = []
+    for key, source, sig, fn in _checks():
+        if sig and _passed_recently(key, sig):
+            continue
+        pending.append((key, sig, submit(source, _run, fn)))
+
+    problems: Dict[str, str] = {}
+    for key, sig, fut in pending:
+        try:
+            reason = fut.result(timeout=max(0.0, started + budget - time.monotonic()))
+        except FutureTimeout:
+            reason = "unreachable (no answer in time)"
+        if reason:
+            problems[key] = reason
+            print(f"[preflight][{key}] {reason}")
+        else:
+            _remember(key, sig)
+    if pending:
+        print(f"[preflight] {len(pending) - len(problems)}/{len(pending)} checks passed in {time.monotonic() - started:.1f}s")
+    return problems
+
+def blocked(problems: Dict[str, str], key: str, source: str) -> bool:
+    return source in problems or key in problems
@@ -0,0 +1,244 @@
+# spoegwolf_daily/query.py
+"""
+Ad-hoc questions over the snapshot store.
+
+  python -m spoegwolf_daily.query list
+  python -m spoegwolf_daily.query delta "droomland kaap" --from 2025-11-12 --to 2025-11-16
+  python -m spoegwolf_daily.query range quicket:342395 --from 2025-12-01 --format json
+  python -m spoegwolf_daily.query rollup quicket: --by week
+  python -m spoegwolf_daily.query compare quicket:342395 quicket:342479 --align start
+  python -m spoegwolf_daily.query range itickets:485051 --group vip
+  python -m spoegwolf_daily.query hours quicket: --from 2025-11-01      # sales by hour of day
+  python -m spoegwolf_daily.query weekdays itickets:485051 --group vip
+  python -m spoegwolf_daily.query around quicket:342395 --at "2025-11-20 19" --hours 12
+
+EVENT is a snapshot key, a key prefix ("quicket:", "itickets:") or part of a configured
+show name; "all" selects everything. Snapshots are end-of-day cumulative totals, so
+"sold from A to B" = value at B - value at the day before A (as-of lookups, gaps allowed);
+with no snapshot before A the sales in the range are unknown, so sold/delta is empty.
+hours / weekdays / around read the purchase-time histograms kept by sales_timing instead.
+"""
+
+from __future__ import annotations
+import sys, csv, json, argparse
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Any
+
+from .config import SHOWS, QUICKET_EVENTS, ITICKETS_EVENTS
+from .snapshot_store import load_snapshots, load_group_snapshots, list_keys, period_of
+from . import sales_timing
+
+
+class Series:
+    """Sorted (date, cumulative total) pairs for one key; lookups are bisects over ISO dates."""
+
+    def __init__(self, key: str, name: str, snaps: Dict[str, int]):
+        self.key = key
+        self.name = name
+        self.dates: List[str] = sorted(snaps)
+        self.values: List[int] = [int(snaps[d]) for d in self.dates]
+
+    def __bool__(self):
+        return bool(self.dates)
+
+    @property
+    def first(self) -> Optional[str]:
+        return self.dates[0] if self.dates else None
+
+    @property
+    def last(self) -> Optional[str]:
+        return self.dates[-1] if self.dates else None
+
+    def at(self, d: str) -> Optional[int]:
+        """Latest value on or before d."""
+        i = bisect_right(self.dates, d)
+        return self.values[i - 1] if i else None
+
+    def sold(self, d0: str, d1: str) -> Optional[int]:
+        """Sold from the start of d0 through the end of d1; None if either end has no snapshot."""
+        end, before = self.at(d1), self.at(_shift(d0, -1))
+        if end is None or before is None:
+            return None
+        return end - before
+
+    def between(self, d0: str, d1: str) -> List[Tuple[str, int]]:
+        i, j = bisect_left(self.dates, d0), bisect_right(self.dates, d1)
+        return list(zip(self.dates[i:j], self.values[i:j]))
+
+
+def _shift(d: str, days: int) -> str:
+    return (date.fromisoformat(d) + timedelta(days=days)).isoformat()
+
+def _names() -> Dict[str, str]:
+    names = {s["event_guid"]: s["name"] for s in SHOWS}
+    names.update({f"quicket:{e['id']}": e["name"] for e in QUICKET_EVENTS})
+    names.update({f"itickets:{e['eid']}": e["name"] for e in ITICKETS_EVENTS})
+    return names
+
+def _values(key: str, group: Optional[str]) -> Dict[str, int]:
+    if not group:
+        return load_snapshots(key)
+    return {d: g[group] for d, g in load_group_snapshots(key).items() if group in g}
+
+def resolve(selectors: List[str], group: Optional[str] = None) -> List[Series]:
+    """Build each matching series once; order follows the selectors."""
+    names = _names()
+    keys = sorted(set(list_keys()) | set(names) | set(sales_timing.timing_keys()))
+    picked: List[str] = []
+    for sel in selectors:
+        low = sel.strip().lower()
+        if low == "all":
+            hits = keys
+        elif sel in keys:
+            hits = [sel]
+        else:
+            hits = [k for k in keys if k.startswith(sel) or low in names.get(k, "").lower()]
+        if not hits:
+            raise SystemExit(f"No snapshots match {sel!r}")
+        picked.extend(k for k in hits if k not in picked)
+    return [Series(k, names.get(k, k), _values(k, group)) for k in picked]
+
+# -------------------- commands --------------------
+
+def cmd_list(series: List[Series], args) -> List[Dict[str, Any]]:
+    return [{"key": s.key, "name": s.name, "first": s.first, "last": s.last,
+             "total": s.values[-1] if s else None, "days": len(s.dates)} for s in series]
+
+def cmd_range(series: List[Series], args) -> List[Dict[str, Any]]:
+    rows = []
+    for s in series:
+        d0, d1 = args.date_from or s.first, args.date_to or s.last
+        if not s:
+            continue
+        prev = s.at(_shift(d0, -1))
+        for d, v in s.between(d0, d1):
+            rows.append({"key": s.key, "name": s.name, "date": d, "total": v,
+                         "delta": None if prev is None else v - prev})
+            prev = v
+    return rows
+
+def cmd_delta(series: List[Series], args) -> List[Dict[str, Any]]:
+    rows = []
+    for s in series:
+        d0, d1 = args.date_from or s.first, args.date_to or s.last
+        if not s:
+            continue
+        rows.append({"key": s.key, "name": s.name, "from": d0, "to": d1,
+                     "start": s.at(_shift(d0, -1)), "end": s.at(d1), "sold": s.sold(d0, d1)})
+    return rows
+
+def cmd_rollup(series: List[Series], args) -> List[Dict[str, Any]]:
+    rows = []
+    for s in series:
+        if not s:
+            continue
+        d0, d1 = args.date_from or s.first, args.date_to or s.last
+        prev = s.at(_shift(d0, -1))
+        period, close = None, None
+        for d, v in s.between(d0, d1) + [(None, None)]:
+            p = period_of(d, args.by) if d else None
+            if period is not None and p != period:
+                rows.append({"key": s.key, "name": s.name, "period": period, "total": close,
+                             "sold": None if prev is None else close - prev})
+                prev = close
+            period, close = p, v
+    return rows
+
+def cmd_compare(series: List[Series], args) -> List[Dict[str, Any]]:
+    """One row per day; aligned by calendar date or by days since each series' first snapshot."""
+    live = [s for s in series if s]
+    if not live:
+        return []
+    rows = []
+    if args.align == "start":
+        span = max((date.fromisoformat(s.last) - date.fromisoformat(s.first)).days for s in live)
+        for off in range(span + 1):
+            row: Dict[str, Any] = {"day": off}
+            for s in live:
+                d = _shift(s.first, off)
+                row[s.name] = s.at(d) if d <= s.last else None
+            rows.append(row)
+    else:
+        d0 = args.date_from or min(s.first for s in live)
+        d1 = args.date_to or max(s.last for s in live)
+        d = d0
+        while d <= d1:
+            row = {"date": d}
+            for s in live:
+                row[s.name] = s.at(d) if d <= s.last else None
+            rows.append(row)
+            d = _shift(d, 1)
+    return rows
+
+def cmd_hours(series: List[Series], args) -> List[Dict[str, Any]]:
+    rows = []
+    for s in series:
+        hist = sales_timing.hour_of_day(s.key, args.group, args.date_from, args.date_to)
+        if sum(hist):
+            rows.extend({"key": s.key, "name": s.name, "hour": h, "sold": n} for h, n in enumerate(hist))
+    return rows
+
+def cmd_weekdays(series: List[Series], args) -> List[Dict[str, Any]]:
+    from .summarize_af import _DAYS
+    rows = []
+    for s in series:
+        hist = sales_timing.day_of_week(s.key, args.group, args.date_from, args.date_to)
+        if sum(hist):
+            rows.extend({"key": s.key, "name": s.name, "weekday": _DAYS[i], "sold": n} for i, n in enumerate(hist))
+    return rows
+
+def cmd_around(series: List[Series], args) -> List[Dict[str, Any]]:
+    """Hourly sales either side of a moment (an announcement, a price change)."""
+    if not args.at:
+        raise SystemExit("around needs --at 'YYYY-MM-DD HH'")
+    try:
+        at = datetime.strptime(args.at.strip()[:13].replace("T", " "), "%Y-%m-%d %H")
+    except ValueError:
+        raise SystemExit(f"Bad --at {args.at!r}; want 'YYYY-MM-DD HH'")
+    rows = []
+    for s in series:
+        if sales_timing.load_timing(s.key) is None:
+            continue
+        rows.extend({"key": s.key, "name": s.name, "offset": off, "hour": h.replace("T", " ") + ":00", "sold": n}
+                    for off, h, n in sales_timing.around(s.key, at, args.hours, args.group))
+    return rows
+
+COMMANDS = {"list": cmd_list, "range": cmd_range, "delta": cmd_delta,
+            "rollup": cmd_rollup, "compare": cmd_compare,
+            "hours": cmd_hours, "weekdays": cmd_weekdays, "around": cmd_around}
+
+def _emit(rows: List[Dict[str, Any]], fmt: str, out=sys.stdout):
+    if fmt == "json":
+        json.dump(rows, out, ensure_ascii=False, indent=1)
+        out.write("\n")
+        return
+    if not rows:
+        return
+    fields: List[str] = []
+    for r in rows:
+        fields.extend(k for k in r if k not in fields)
+    w = csv.DictWriter(out, fieldnames=fields, lineterminator="\n")
+    w.writeheader()
+    w.writerows(rows)
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Query snapshot history")
+    ap.add_argument("command", choices=sorted(COMMANDS))
+    ap.add_argument("events", nargs="*", default=["all"], help="keys, key prefixes or show names")
+    ap.add_argument("--from", dest="date_from", help="first day (YYYY-MM-DD)")
+    ap.add_argument("--to", dest="date_to", help="last day (YYYY-MM-DD)")
+    ap.add_argument("--by", choices=["week", "month"], default="week", help="rollup period")
+    ap.add_argument("--align", choices=["date", "start"], default="date", help="compare alignment")
+    ap.add_argument("--group", help="use one ticket group's series (ga, kids, goue, normal, vip) instead of totals")
+    ap.add_argument("--at", help="around: local hour to centre on ('YYYY-MM-DD HH')")
+    ap.add_argument("--hours", type=int, default=24, help="around: hours either side (default 24)")
+    ap.add_argument("--format", choices=["csv", "json"], default="csv")
+    args = ap.parse_args(argv)
+
+    series = resolve(args.events or ["all"], args.group)
+    _emit(COMMANDS[args.command](series, args), args.format)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,92 @@
+# spoegwolf_daily/report_cache.py
+from __future__ import annotations
+import os, json, time, hashlib
+from functools import lru_cache
+from typing import Dict, Any, Optional
+
+from .config import namespaced
+
+CACHE_DIR = os.getenv("CACHE_DIR", "data/cache")
+# Rendered reports older than this are pruned on the next store
+REPORT_CACHE_DAYS = 14
+
+def _report_dir() -> str:
+    d = namespaced(os.path.join(CACHE_DIR, "report"))
+    os.makedirs(d, exist_ok=True)
+    return d
+
+def _report_path(key: str) -> str:
+    return os.path.join(_report_dir(), f"{key}.json")
+
+def _normalize(obj: Any) -> Any:
+    """Make inputs hash-stable: round money, strip strings, recurse into containers."""
+    if isinstance(obj, float):
+        return round(obj, 2)
+    if isinstance(obj, str):
+        return obj.strip()
+    if isinstance(obj, dict):
+        return {str(k): _normalize(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_normalize(v) for v in obj]
+    return obj
+
+@lru_cache(maxsize=1)
+def _renderer_stamp() -> str:
+    """Changes whenever the formatter code does, so editing summarize_af re-renders.
+    Hashes the source, not its mtime: every CI checkout has fresh mtimes."""
+    from . import summarize_af
+    from .senders import emailer
+    h = hashlib.sha256()
+    for mod in (summarize_af, emailer):
+        with open(mod.__file__, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+def report_key(inputs: Dict[str, Any]) -> str:
+    """sha256 over the normalized build_message inputs (plus the renderer version)."""
+    blob = json.dumps([_normalize(inputs), _renderer_stamp()], sort_keys=True, separators=(",", ":"),
+                      ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def load_report(key: str) -> Optional[Dict[str, Any]]:
+    """Returns {'text', 'html', 'sent': [subjects]} or None."""
+    p = _report_path(key)
+    if not os.path.exists(p):
+        return None
+    with open(p, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return None
+
+def _write(key: str, entry: Dict[str, Any]):
+    p = _report_path(key)
+    tmp = p + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp, p)
+
+def _prune():
+    cutoff = time.time() - REPORT_CACHE_DAYS * 86400
+    d = _report_dir()
+    for name in os.listdir(d):
+        p = os.path.join(d, name)
+        try:
+            if os.path.getmtime(p) < cutoff:
+                os.remove(p)
+        except OSError:
+            pass
+
+def store_report(key: str, text: str, html_body: str) -> Dict[str, Any]:
+    entry = {"text": text, "html": html_body, "sent": [], "created": int(time.time())}
+    _write(key, entry)
+    _prune()
+    return entry
+
+def mark_sent(key: str, subject: str):
+    entry = load_report(key)
+    if entry is None:
+        return
+    if subject not in entry.get("sent", []):
+        entry.setdefault("sent", []).append(subject)
+        _write(key, entry)
@@ -0,0 +1,206 @@
+# spoegwolf_daily/sales_timing.py
+"""
+When people buy: per-event, per-group purchase counts by local hour, maintained incrementally.
+
+  python -m spoegwolf_daily.sales_timing sync              # fold in rows added since last sync
+  python -m spoegwolf_daily.sales_timing sync --rebuild    # start over (picks up voided tickets)
+  python -m spoegwolf_daily.query hours quicket:342395      # views: hours / weekdays / around
+
+data/cache/nightly/timing/<key>.json (derived state, rewritten whole on every sync, so it is
+kept out of the committed snapshot store; the nightly workflow persists it with actions/cache):
+  {"groups": {"ga": {"2025-11-20T19": 12, ...}, "kids": {...}},   # sparse, local (TZ) hours
+   "cursor": {...}, "sig": "<groups config>"}
+
+Quicket guest lists grow at the end, so the cursor is the number of rows folded so far: a sync
+fetches only from the page holding the next row. The iTickets feed is always downloaded whole,
+but the cursor (character offset + the last folded line) means only the appended tail is
+parsed. If the feed changes above the cursor or the groups config changes, the event is
+rebuilt. Rows are counted as of when they were folded in; a later void is only picked up by
+a rebuild. Only Quicket and iTickets rows carry purchase times; Plankton has none.
+"""
+from __future__ import annotations
+import os, io, csv, json, argparse
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from .config import CFG, QUICKET_EVENTS, ITICKETS_EVENTS, namespaced
+from .guest_table import local_seconds, QUICKET_TS_FIELDS, ITICKETS_TS_FIELDS
+
+TIMING_DIR = os.path.join(os.getenv("CACHE_DIR", "data/cache"), "nightly", "timing")
+PAGE_SIZE = 500  # quicket._iter_pages page size
+_QUICKET_GROUP = {"adults": "ga", "kids": "kids"}  # snapshot group names
+_EPOCH = date(1970, 1, 1)
+
+
+def _path(key: str) -> str:
+    return os.path.join(namespaced(TIMING_DIR), f"{key}.json")
+
+def load_timing(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def timing_keys() -> List[str]:
+    try:
+        return sorted(f[:-5] for f in os.listdir(namespaced(TIMING_DIR)) if f.endswith(".json"))
+    except OSError:
+        return []
+
+def _save(key: str, state: Dict[str, Any]):
+    p = _path(key)
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    state["groups"] = {g: dict(sorted(h.items())) for g, h in sorted(state["groups"].items())}
+    tmp = p + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(tmp, p)
+
+def _hour(secs: int) -> str:
+    """Local wall-clock seconds -> 'YYYY-MM-DDTHH'."""
+    return f"{(_EPOCH + timedelta(days=secs // 86400)).isoformat()}T{secs % 86400 // 3600:02d}"
+
+def _fold(hist: Dict[str, Dict[str, int]], group: str, secs: int):
+    if secs > 0:
+        h = hist.setdefault(group, {})
+        k = _hour(secs)
+        h[k] = h.get(k, 0) + 1
+
+def _fresh(state: Optional[Dict[str, Any]], sig: str) -> Dict[str, Any]:
+    if state is None or state.get("sig") != sig:
+        return {"groups": {}, "cursor": {}, "sig": sig}
+    return state
+
+# -------------------- sync --------------------
+
+def sync_quicket(ev: Dict[str, Any], tz: str, rebuild: bool = False) -> int:
+    """Fold new guests of one Quicket event; returns the number of rows folded."""
+    from .data_sources.quicket import _iter_pages, _group_sets, classify_guest
+    key = f"quicket:{ev['id']}"
+    groups = ev.get("groups", {})
+    state = _fresh(None if rebuild else load_timing(key), json.dumps(groups, sort_keys=True))
+    done = int(state["cursor"].get("rows", 0))
+    sets = _group_sets(groups)
+    field = state["cursor"].get("field")
+    n = 0
+    for page, js in _iter_pages(int(ev["id"]), done // PAGE_SIZE + 1):
+        rows = js.get("results") or []
+        for g in rows[done % PAGE_SIZE if page == done // PAGE_SIZE + 1 else 0:]:
+            n += 1
+            if field is None:
+                field = next((k for k in QUICKET_TS_FIELDS if g.get(k)), "")
+            group = _QUICKET_GROUP.get(classify_guest(g, sets))
+            if group and field:
+                _fold(state["groups"], group, local_seconds(g.get(field), tz))
+    state["cursor"] = {"rows": done + n, "field": field}
+    _save(key, state)
+    return n
+
+def sync_itickets(ev: Dict[str, Any], tz: str, rebuild: bool = False, text: Optional[str] = None) -> int:
+    """Fold rows appended to one iTickets feed since the last sync (pass text if already fetched)."""
+    from .data_sources.itickets import fetch_itickets_text_via_curl, classify_row
+    from .main import itickets_feed_url
+    key = f"itickets:{ev['eid']}"
+    if text is None:
+        text = fetch_itickets_text_via_curl(itickets_feed_url(ev))
+    header = text[:text.find("\n") + 1] if "\n" in text else text
+    state = _fresh(None if rebuild else load_timing(key), header.strip())
+    cur = state["cursor"]
+    offset, tail = int(cur.get("offset", 0)), cur.get("tail", "")
+    if offset and not (offset <= len(text) and text.startswith(tail, offset - len(tail))):
+        print(f"[timing][itickets] {ev['name']}: feed changed above the last sync; rebuilding")
+        state, offset = _fresh(None, header.strip()), 0
+    start = max(offset, len(header))
+    end = text.rfind("\n") + 1  # whole records only; a torn last one waits for the next sync
+    while end > start and text.count('"', start, end) % 2:  # cut inside a quoted field
+        end = text.rfind("\n", 0, end - 1) + 1
+    n = 0
+    if end > start:
+        reader = csv.DictReader(io.StringIO(header + text[start:end]))
+        field = next((k for k in ITICKETS_TS_FIELDS if k in (reader.fieldnames or [])), "")
+        for r in reader:
+            n += 1
+            group = classify_row(r)
+            if group and field:
+                _fold(state["groups"], group, local_seconds(r.get(field), tz))
+        last_nl = text.rfind("\n", 0, end - 1)
+        state["cursor"] = {"offset": end, "tail": text[last_nl + 1:end]}
+    _save(key, state)
+    return n
+
+def sync_all(rebuild: bool = False) -> int:
+    tz = CFG["TZ"]
+    from .archive import load_archive
+    total = 0
+    for ev in QUICKET_EVENTS:
+        if load_archive(f"quicket:{ev['id']}") is None:
+            n = sync_quicket(ev, tz, rebuild)
+            print(f"[timing][quicket] {ev['name']}: {n} new rows folded")
+            total += n
+    for ev in ITICKETS_EVENTS:
+        if load_archive(f"itickets:{ev['eid']}") is None:
+            n = sync_itickets(ev, tz, rebuild)
+            print(f"[timing][itickets] {ev['name']}: {n} new rows folded")
+            total += n
+    return total
+
+def enabled() -> bool:
+    return (CFG.get("SALES_TIMING") or "0").strip().lower() in ("1", "true", "yes")
+
+# -------------------- views --------------------
+
+def hourly(key: str, group: Optional[str] = None, d0: Optional[str] = None,
+           d1: Optional[str] = None) -> Dict[str, int]:
+    """{'YYYY-MM-DDTHH': sold} for one group or all, optionally within [d0, d1] (dates)."""
+    state = load_timing(key) or {"groups": {}}
+    out: Dict[str, int] = {}
+    for g, hist in state["groups"].items():
+        if group and g != group:
+            continue
+        for h, n in hist.items():
+            if (d0 and h[:10] < d0) or (d1 and h[:10] > d1):
+                continue
+            out[h] = out.get(h, 0) + n
+    return out
+
+def hour_of_day(key: str, group: Optional[str] = None, d0: Optional[str] = None, d1: Optional[str] = None) -> List[int]:
+    hist = [0] * 24
+    for h, n in hourly(key, group, d0, d1).items():
+        hist[int(h[11:13])] += n
+    return hist
+
+def day_of_week(key: str, group: Optional[str] = None, d0: Optional[str] = None, d1: Optional[str] = None) -> List[int]:
+    hist = [0] * 7
+    for h, n in hourly(key, group, d0, d1).items():
+        hist[date.fromisoformat(h[:10]).weekday()] += n
+    return hist
+
+def around(key: str, at: datetime, hours: int = 24, group: Optional[str] = None) -> List[Tuple[int, str, int]]:
+    """(offset in hours, hour, sold) from `hours` before to `hours` after a local time."""
+    by_hour = hourly(key, group)
+    base = at.replace(minute=0, second=0, microsecond=0)
+    out = []
+    for off in range(-hours, hours + 1):
+        h = (base + timedelta(hours=off)).strftime("%Y-%m-%dT%H")
+        out.append((off, h, by_hour.get(h, 0)))
+    return out
+
+def peak(key: str) -> Optional[Dict[str, int]]:
+    """Busiest weekday (0 = Monday) and local hour over everything folded so far; None if empty."""
+    hod, dow = hour_of_day(key), day_of_week(key)
+    if not sum(hod):
+        return None
+    return {"weekday": dow.index(max(dow)), "hour": hod.index(max(hod))}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Maintain purchase-time histograms per event")
+    ap.add_argument("command", choices=["sync"])
+    ap.add_argument("--rebuild", action="store_true", help="drop the histograms and refold every row")
+    args = ap.parse_args(argv)
+    n = sync_all(rebuild=args.rebuild)
+    print(f"[timing] {n} rows folded")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,116 @@
+# spoegwolf_daily/scheduler.py
+"""
+One bounded worker pool for every fetch in the process, shared by all tenants.
+
+  fut = submit("quicket", fn, *args)     # runs fn in the caller's context (tenant, tracing)
+  results, left = run_queue(jobs, budget=1800)   # long job lists, highest priority first
+
+FETCH_WORKERS caps concurrent fetches overall (default 8); SOURCE_CONCURRENCY_<SOURCE> caps
+them per API (default 4), so N tenants don't hit one provider N times harder.
+"""
+from __future__ import annotations
+import os, time, threading, contextvars
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+_POOL = None
+_SEMS: Dict[str, threading.BoundedSemaphore] = {}
+_LOCK = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+def pool() -> ThreadPoolExecutor:
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=_env_int("FETCH_WORKERS", 8), thread_name_prefix="fetch")
+        return _POOL
+
+def source_limit(source: str) -> threading.BoundedSemaphore:
+    with _LOCK:
+        sem = _SEMS.get(source)
+        if sem is None:
+            sem = _SEMS[source] = threading.BoundedSemaphore(_env_int(f"SOURCE_CONCURRENCY_{source.upper()}", 4))
+        return sem
+
+def submit(source: str, fn: Callable, *args, **kwargs) -> Future:
+    ctx = contextvars.copy_context()
+
+    def job():
+        with source_limit(source):
+            return ctx.run(fn, *args, **kwargs)
+    return pool().submit(job)
+
+def run_queue(jobs: List[Tuple[str, str, Callable[[], Any]]], budget: Optional[float] = None,
+              on_done: Optional[Callable[[str, Any], None]] = None) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    jobs: (key, source, fn) in priority order. Keeps up to FETCH_WORKERS running, at most
+    SOURCE_CONCURRENCY_<SOURCE> per source, and always starts the first waiting job whose
+    source has room, so a long Quicket backlog never holds up a Plankton call. Nothing new
+    starts after `budget` seconds; running jobs finish. on_done(key, result) runs in the
+    caller's thread as each job succeeds.
+    Returns ({key: result, or the exception it raised}, keys never started).
+    """
+    cap = _env_int("FETCH_WORKERS", 8)
+    stop_at = time.monotonic() + budget if budget else None
+    waiting = list(jobs)
+    running: Dict[Future, Tuple[str, str]] = {}
+    per_source: Dict[str, int] = {}
+    results: Dict[str, Any] = {}
+    while waiting or running:
+        open_ = stop_at is None or time.monotonic() < stop_at
+        i = 0
+        while open_ and i < len(waiting) and len(running) < cap:
+            key, source, fn = waiting[i]
+            if per_source.get(source, 0) >= _env_int(f"SOURCE_CONCURRENCY_{source.upper()}", 4):
+                i += 1
+                continue
+            waiting.pop(i)
+            running[submit(source, fn)] = (key, source)
+            per_source[source] = per_source.get(source, 0) + 1
+        if not running:
+            break  # out of budget with nothing in flight
+        done, _ = wait(running, return_when=FIRST_COMPLETED)  # caps only free up on completion
+        for fut in done:
+            key, source = running.pop(fut)
+            per_source[source] -= 1
+            try:
+                results[key] = fut.result()
+            except Exception as e:
+                results[key] = e
+                continue
+            if on_done is not None:
+                on_done(key, results[key])
+    return results, [key for key, _, _ in waiting]
+
+def for_each_tenant(tenants: List[Any], fn: Callable[[], Any]) -> Dict[str, Any]:
+    """
+    Run fn() once per tenant, concurrently, each in its own thread with that tenant active.
+    Returns {tenant name: result or the exception it raised}. A single tenant runs inline and
+    its exceptions propagate, exactly like a plain run.
+    """
+    from .config import use_tenant
+    results: Dict[str, Any] = {}
+    if len(tenants) == 1:
+        with use_tenant(tenants[0]):
+            return {tenants[0].name: fn()}
+
+    def one(t):
+        with use_tenant(t):
+            try:
+                results[t.name] = fn()
+            except Exception as e:
+                print(f"[tenant:{t.name}] failed: {e}")
+                results[t.name] = e
+
+    threads = [threading.Thread(target=one, args=(t,), name=f"tenant-{t.name}") for t in tenants]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return results
@@ -1,7 +1,9 @@
 import smtplib, ssl, html, re
+from typing import Optional
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from ..config import CFG
+from ..tracing import traced
 
 def _clean(s: str) -> str:
     return (s or "").replace("\u00A0","").strip()
@@ -57,7 +59,8 @@ def _text_to_html(body_text: str) -> str:
   </body>
 </html>"""
 
-def send_email_summary(subject: str, body_text: str):
+@traced("emailer.send_email_summary")
+def send_email_summary(subject: str, body_text: str, html_body: Optional[str] = None):
     host = CFG.get("EMAIL_HOST", "smtp.gmail.com")
     port = int(CFG.get("EMAIL_PORT", "465"))
     user = _clean(CFG.get("EMAIL_USER"))
@@ -74,7 +77,8 @@ def send_email_summary(subject: str, body_text: str):
     msg["To"] = ", ".join(recipients)
     msg["Subject"] = subject
 
-    html_body = _text_to_html(body_text)
+    if html_body is None:
+        html_body = _text_to_html(body_text)
 
     # Plaintext part (what you already generate)
     part_text = MIMEText(body_text, "plain", "utf-8")
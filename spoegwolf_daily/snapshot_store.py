@@ -1,42 +1,412 @@
 from __future__ import annotations
-import os, json
+import os, json, threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 import pytz
 
+from .config import namespaced
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use only
+    fcntl = None
+
 SNAP_DIR = os.getenv("SNAP_DIR", "data/snapshots")
+INTRADAY_DIR = os.getenv("INTRADAY_DIR", "data/intraday")
+# A tenant with its own namespace (config.TENANTS_FILE) lives in SNAP_DIR/<namespace>/ etc.
+
+# Layout per key:
+#   <key>.json  compact base, rewritten only by compaction:
+#               {date: total} or, when groups are known, {date: [total, {group: n}]}
+#   <key>.log   append-only, one JSON line per write: ["YYYY-MM-DD", total(, {group: n})]
+# Readers fold the log over the base; the last line for a date wins. Old total-only
+# files stay valid; they just have no groups for those days.
+#
+# Concurrency: one advisory lock file per namespace (<SNAP_DIR>/.lock). Readers hold it shared, writers
+# (appends, compaction, transaction()) exclusive, so a manual run, the nightly job and
+# compaction can overlap without losing lines. Nested use inside a held lock is free.
+
+Groups = Dict[str, int]
+
+# base path -> (base stat, log stat, log bytes consumed, merged totals, merged groups)
+_CACHE: Dict[str, Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]], int,
+                        Dict[str, int], Dict[str, Groups]]] = {}
+
+_held = threading.local()
+
+@contextmanager
+def _locked(exclusive: bool):
+    mode = getattr(_held, "mode", None)
+    if mode == "ex" or (mode == "sh" and not exclusive):
+        yield
+        return
+    if mode == "sh":
+        raise RuntimeError("snapshot store: take transaction() before reading, not inside a read")
+    if fcntl is None:
+        _held.mode = "ex" if exclusive else "sh"
+        try:
+            yield
+        finally:
+            _held.mode = None
+        return
+    _ensure_dir()
+    fd = os.open(os.path.join(_dir(), ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        _held.mode = "ex" if exclusive else "sh"
+        yield
+    finally:
+        _held.mode = None
+        os.close(fd)  # releases the flock
+
+def transaction():
+    """
+    Exclusive lock over the whole store, for read-modify-write sequences:
+
+        with transaction():
+            if day not in load_snapshots(key):
+                save_snapshot(key, day, total)
+    """
+    return _locked(True)
+
+def _dir() -> str:
+    return namespaced(SNAP_DIR)
 
 def _ensure_dir():
-    os.makedirs(SNAP_DIR, exist_ok=True)
+    os.makedirs(_dir(), exist_ok=True)
 
 def _snap_path(event_guid: str) -> str:
     _ensure_dir()
-    return os.path.join(SNAP_DIR, f"{event_guid}.json")
+    return os.path.join(_dir(), f"{event_guid}.json")
 
-def load_snapshots(event_guid: str) -> Dict[str, int]:
-    p = _snap_path(event_guid)
+def _log_path(event_guid: str) -> str:
+    _ensure_dir()
+    return os.path.join(_dir(), f"{event_guid}.log")
+
+def _stat(p: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(p)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _put(snaps: Dict[str, int], groups: Dict[str, Groups], d: str, value) -> None:
+    """Store one base/log value (int or [total, groups]) into the merged view."""
+    if isinstance(value, list):
+        snaps[d] = int(value[0])
+        if len(value) > 1 and isinstance(value[1], dict):
+            groups[d] = {g: int(n) for g, n in value[1].items()}
+        else:
+            groups.pop(d, None)
+    else:
+        snaps[d] = int(value)
+        groups.pop(d, None)
+
+def _read_base(p: str) -> Tuple[Dict[str, int], Dict[str, Groups]]:
+    snaps: Dict[str, int] = {}
+    groups: Dict[str, Groups] = {}
     if not os.path.exists(p):
-        return {}
+        return snaps, groups
     with open(p, "r", encoding="utf-8") as f:
         try:
-            return json.load(f)
+            data = json.load(f)
         except json.JSONDecodeError:
-            return {}
+            return snaps, groups
+    if isinstance(data, dict):
+        for d, v in data.items():
+            try:
+                _put(snaps, groups, d, v)
+            except (ValueError, TypeError, IndexError):
+                continue
+    return snaps, groups
+
+def _apply_log(p: str, snaps: Dict[str, int], groups: Dict[str, Groups], offset: int = 0) -> int:
+    """Fold complete log lines from offset into the merged view; returns the new offset."""
+    if not os.path.exists(p):
+        return 0
+    with open(p, "rb") as f:
+        f.seek(offset)
+        chunk = f.read()
+    end = chunk.rfind(b"\n") + 1  # ignore a trailing partial line (write in progress)
+    for line in chunk[:end].splitlines():
+        try:
+            rec = json.loads(line)
+            _put(snaps, groups, rec[0], rec[1:] if len(rec) > 2 else rec[1])
+        except (ValueError, TypeError, IndexError):
+            continue
+    return offset + end
+
+def _load(event_guid: str) -> Tuple[Dict[str, int], Dict[str, Groups]]:
+    """Merged (totals, groups) straight from the per-process cache. Callers must not mutate."""
+    with _locked(False):
+        base_p, log_p = _snap_path(event_guid), _log_path(event_guid)
+        base_st, log_st = _stat(base_p), _stat(log_p)
+
+        hit = _CACHE.get(base_p)
+        if hit and hit[0] == base_st:
+            _, cached_log_st, offset, snaps, groups = hit
+            if cached_log_st == log_st:
+                return snaps, groups
+            if log_st is not None and log_st[1] >= offset:
+                offset = _apply_log(log_p, snaps, groups, offset)
+                _CACHE[base_p] = (base_st, log_st, offset, snaps, groups)
+                return snaps, groups
+
+        snaps, groups = _read_base(base_p)
+        offset = _apply_log(log_p, snaps, groups)
+        _CACHE[base_p] = (base_st, log_st, offset, snaps, groups)
+        return snaps, groups
+
+def load_snapshots(event_guid: str) -> Dict[str, int]:
+    """Merged {date: total} of base + log. Cached per process; a grown log is read from where we left off."""
+    return dict(_load(event_guid)[0])
 
-def save_snapshot(event_guid: str, date_str: str, total: int) -> bool:
+def load_group_snapshots(event_guid: str) -> Dict[str, Groups]:
+    """{date: {group: n}} for the days that were stored with a group split."""
+    return {d: dict(g) for d, g in _load(event_guid)[1].items()}
+
+def save_snapshots(event_guid: str, values: Dict[str, int],
+                   groups: Optional[Dict[str, Groups]] = None) -> Dict[str, int]:
     """
-    Add/overwrite the value for date_str. Returns True if file changed.
-    Meant for the nightly job only.
+    Append every date whose value (or group split) differs from the merged view, in one write.
+    Returns the {date: total} entries that were actually written.
     """
-    snaps = load_snapshots(event_guid)
-    before = snaps.get(date_str)
-    snaps[date_str] = int(total)
-    changed = (before != snaps[date_str])
-    if changed:
-        with open(_snap_path(event_guid), "w", encoding="utf-8") as f:
-            json.dump(snaps, f, indent=2, sort_keys=True)
+    groups = groups or {}
+    changed: Dict[str, int] = {}
+    lines = []
+    with _locked(True):
+        snaps, known = _load(event_guid)
+        for d, v in sorted(values.items()):
+            g = {k: int(n) for k, n in (groups.get(d) or {}).items()}
+            if snaps.get(d) == int(v) and (not g or known.get(d) == g):
+                continue
+            changed[d] = int(v)
+            lines.append(json.dumps([d, int(v), g] if g else [d, int(v)], separators=(",", ":")) + "\n")
+        if lines:
+            prev_last = max(snaps) if snaps else None
+            with open(_log_path(event_guid), "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+            _update_rollup(event_guid, changed, prev_last)
     return changed
 
+def save_snapshot(event_guid: str, date_str: str, total: int, groups: Optional[Groups] = None) -> bool:
+    """
+    Add/overwrite the value (and optional {group: n} split) for date_str.
+    Returns True if the store changed. Meant for the nightly job only.
+    """
+    return bool(save_snapshots(event_guid, {date_str: total}, {date_str: groups} if groups else None))
+
+def list_keys() -> List[str]:
+    _ensure_dir()
+    keys = set()
+    for name in os.listdir(_dir()):
+        stem, ext = os.path.splitext(name)
+        if ext in (".json", ".log") and not stem.startswith("."):
+            keys.add(stem)
+    return sorted(keys)
+
+def base_json(event_guid: str) -> str:
+    """The merged view serialized the way compaction writes base files."""
+    snaps, groups = _load(event_guid)
+    base = {d: ([v, groups[d]] if d in groups else v) for d, v in snaps.items()}
+    return json.dumps(base, separators=(",", ":"), sort_keys=True)
+
+def compact(event_guid: str) -> bool:
+    """
+    Fold the log into a compact base file and drop the log.
+    Safe to interrupt: replaying a log over an already-compacted base is idempotent.
+    """
+    with _locked(True):
+        log_p = _log_path(event_guid)
+        if not os.path.exists(log_p):
+            return False
+        base_p = _snap_path(event_guid)
+        tmp = base_p + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(base_json(event_guid))
+        os.replace(tmp, base_p)
+        os.remove(log_p)
+        _CACHE.pop(base_p, None)
+    return True
+
+# -------------------- weekly / monthly rollups --------------------
+# rollups/<key>.json: {"last": [date, total],
+#                      "week":  {"2025-W46": [open, close]},
+#                      "month": {"2025-11":  [open, close]}}
+# open = total at the end of the previous stored day (None before the first snapshot),
+# close = total at the last stored day of the period, so sold = close - open. Snapshot days
+# are already local (TZ) dates. Kept up to date by save_snapshots: appends in date order
+# touch one period each; out-of-order writes (backfills) rebuild the key's rollup.
+# Derived data, gitignored: a fresh checkout rebuilds each rollup from the logs on first use.
+
+ROLLUP_PERIODS = ("week", "month")
+
+_ROLLUPS: Dict[str, Tuple[Optional[Tuple[int, int]], Dict]] = {}
+
+def period_of(d: str, by: str) -> str:
+    """ISO week ('2025-W46') or month ('2025-11') label for a date."""
+    if by == "week":
+        y, w, _ = datetime.strptime(d, "%Y-%m-%d").date().isocalendar()
+        return f"{y}-W{w:02d}"
+    return d[:7]
+
+def _rollup_path(event_guid: str) -> str:
+    return os.path.join(_dir(), "rollups", f"{event_guid}.json")
+
+def _build_rollup(snaps: Dict[str, int]) -> Dict:
+    roll: Dict = {"last": None, "week": {}, "month": {}}
+    for d in sorted(snaps):
+        _roll_day(roll, d, snaps[d])
+    return roll
+
+def _roll_day(roll: Dict, d: str, total: int):
+    """Fold one day that is on or after roll['last'] into the rollup."""
+    last = roll["last"]
+    before = last[1] if last and last[0] < d else None  # total at the end of the previous stored day
+    for by in ROLLUP_PERIODS:
+        p = period_of(d, by)
+        if p in roll[by]:
+            roll[by][p][1] = total
+        else:
+            roll[by][p] = [before, total]
+    roll["last"] = [d, total]
+
+def _write_rollup(event_guid: str, roll: Dict):
+    p = _rollup_path(event_guid)
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = p + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(roll, f, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp, p)
+    _ROLLUPS.pop(p, None)
+
+def _read_rollup(event_guid: str) -> Optional[Dict]:
+    p = _rollup_path(event_guid)
+    st = _stat(p)
+    if st is None:
+        return None
+    hit = _ROLLUPS.get(p)
+    if hit and hit[0] == st:
+        return hit[1]
+    with open(p, "r", encoding="utf-8") as f:
+        try:
+            roll = json.load(f)
+        except json.JSONDecodeError:
+            return None
+    _ROLLUPS[p] = (st, roll)
+    return roll
+
+def _update_rollup(event_guid: str, changed: Dict[str, int], prev_last: Optional[str]):
+    """Called under the write lock after save_snapshots appended `changed`."""
+    roll = _read_rollup(event_guid)
+    in_order = prev_last is None or min(changed) >= prev_last
+    if roll is None or not in_order or (roll["last"] or [None])[0] != prev_last:
+        roll = _build_rollup(_load(event_guid)[0])
+    else:
+        roll = json.loads(json.dumps(roll))  # don't mutate the cached copy
+        for d in sorted(changed):
+            _roll_day(roll, d, changed[d])
+    _write_rollup(event_guid, roll)
+
+def rebuild_rollup(event_guid: str) -> Dict:
+    with _locked(True):
+        roll = _build_rollup(_load(event_guid)[0])
+        _write_rollup(event_guid, roll)
+    return roll
+
+def load_rollup(event_guid: str) -> Dict:
+    """{'last', 'week', 'month'} for a key; built once if it does not exist yet."""
+    with _locked(False):
+        roll = _read_rollup(event_guid)
+    if roll is None:
+        roll = rebuild_rollup(event_guid)
+    return roll
+
+def period_sales(event_guid: str, by: str, period: str) -> Optional[int]:
+    """Tickets sold in one ISO week / month (None if no snapshot in it or no baseline before it)."""
+    entry = load_rollup(event_guid)[by].get(period)
+    if entry is None or entry[0] is None:
+        return None
+    return int(entry[1]) - int(entry[0])
+
+def source_keys(source: str) -> List[str]:
+    """Keys for 'quicket' / 'itickets' / 'plankton' (bare event GUIDs)."""
+    if source == "plankton":
+        return [k for k in list_keys() if ":" not in k]
+    return [k for k in list_keys() if k.startswith(f"{source}:")]
+
+def source_period_sales(source: str, by: str, period: str) -> Optional[int]:
+    """period_sales summed over every event of a source (None if none had a value)."""
+    vals = [v for v in (period_sales(k, by, period) for k in source_keys(source)) if v is not None]
+    return sum(vals) if vals else None
+
+def week_over_week(event_guid: str, tz_name: str) -> Tuple[Optional[int], Optional[int]]:
+    """(sold in the ISO week containing yesterday, sold in the week before)."""
+    yday = datetime.now(pytz.timezone(tz_name)).date() - timedelta(days=1)
+    this_w = period_of(yday.isoformat(), "week")
+    last_w = period_of((yday - timedelta(days=7)).isoformat(), "week")
+    return period_sales(event_guid, "week", this_w), period_sales(event_guid, "week", last_w)
+
+# -------------------- intraday points --------------------
+# data/intraday/<key>.log: one ["<ISO timestamp>", total] line per observed change (watch mode)
+
+def append_intraday(event_guid: str, ts_iso: str, total: int):
+    d = namespaced(INTRADAY_DIR)
+    os.makedirs(d, exist_ok=True)
+    with open(os.path.join(d, f"{event_guid}.log"), "a", encoding="utf-8") as f:
+        f.write(json.dumps([ts_iso, int(total)]) + "\n")
+
+def load_intraday(event_guid: str) -> List[Tuple[str, int]]:
+    p = os.path.join(namespaced(INTRADAY_DIR), f"{event_guid}.log")
+    if not os.path.exists(p):
+        return []
+    out = []
+    with open(p, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                ts, total = json.loads(line)[:2]
+                out.append((ts, int(total)))
+            except (ValueError, TypeError):
+                continue
+    return out
+
+# -------------------- audit index --------------------
+# <SNAP_DIR>/audit/<key>.log: one ["<commit time ISO>", "YYYY-MM-DD", total, "<commit>"] line for
+# every value ever committed for a key/day, oldest first, including values later overwritten.
+# Built from git history by tools/git_history; derived data, so it is not committed.
+
+def _audit_dir() -> str:
+    return os.path.join(_dir(), "audit")
+
+def append_audit(event_guid: str, rows: List[Tuple[str, str, int, str]]):
+    if not rows:
+        return
+    d = _audit_dir()
+    os.makedirs(d, exist_ok=True)
+    with open(os.path.join(d, f"{event_guid}.log"), "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps([ts, day, int(total), commit]) + "\n" for ts, day, total, commit in rows))
+
+def load_audit(event_guid: str) -> List[Tuple[str, str, int, str]]:
+    p = os.path.join(_audit_dir(), f"{event_guid}.log")
+    if not os.path.exists(p):
+        return []
+    out = []
+    with open(p, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                ts, day, total, commit = json.loads(line)
+                out.append((ts, day, int(total), commit))
+            except (ValueError, TypeError):
+                continue
+    return out
+
+def clear_audit():
+    d = _audit_dir()
+    if os.path.isdir(d):
+        for name in os.listdir(d):
+            os.remove(os.path.join(d, name))
+
 def yesterday_delta(event_guid: str, tz_name: str) -> Optional[int]:
     """
     Delta = snapshots[yesterday] - snapshots[day_before_yesterday]
@@ -49,4 +419,17 @@ def yesterday_delta(event_guid: str, tz_name: str) -> Optional[int]:
     dby = (today - timedelta(days=2)).isoformat()
     if y in snaps and dby in snaps:
         return int(snaps[y]) - int(snaps[dby])
-    return None
\ No newline at end of file
+    return None
+
+def yesterday_group_delta(event_guid: str, tz_name: str) -> Optional[Groups]:
+    """
+    Per-group version of yesterday_delta: {group: yesterday - day before}.
+    None unless both days were stored with a group split.
+    """
+    groups = _load(event_guid)[1]
+    today = datetime.now(pytz.timezone(tz_name)).date()
+    y = groups.get((today - timedelta(days=1)).isoformat())
+    dby = groups.get((today - timedelta(days=2)).isoformat())
+    if y is None or dby is None:
+        return None
+    return {g: int(n) - int(dby.get(g, 0)) for g, n in y.items()}
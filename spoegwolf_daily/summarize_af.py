@@ -1,6 +1,8 @@
 from datetime import datetime
 import pytz
 
+from .tracing import traced
+
 _DAYS = ["Maandag","Dinsdag","Woensdag","Donderdag","Vrydag","Saterdag","Sondag"]
 _MONTHS = ["Januarie","Februarie","Maart","April","Mei","Junie","Julie",
            "Augustus","September","Oktober","November","Desember"]
@@ -9,34 +11,91 @@ def _af_date(dt: datetime) -> str:
     dname = _DAYS[dt.weekday()]
     return f"{dname}, {dt.day:02d} {_MONTHS[dt.month-1]} {dt.year}"
 
+_GROUP_LABELS = {"ga": "GA", "kids": "Kids", "goue": "Goue Kraal", "normal": "Normal", "vip": "VIP"}
+
+def _yday_line(b) -> str:
+    """'Gister se verkope: 12 (GA 10, Kids 2)' when the per-group split is known."""
+    yday = b.get("yesterday")
+    if yday is None:
+        return "Gister se verkope: NVT"
+    split = b.get("yesterday_groups") or {}
+    parts = [f"{_GROUP_LABELS.get(g, g)} {n}" for g, n in split.items() if n]
+    if len(parts) < 2:
+        return f"Gister se verkope: {yday}"
+    return f"Gister se verkope: {yday} ({', '.join(parts)})"
+
+def _week_line(b):
+    """'Hierdie week vs verlede week: 45 vs 60' (None when off or unknown)."""
+    week = b.get("week")
+    if not week or week[0] is None and week[1] is None:
+        return None
+    this, last = ("NVT" if n is None else n for n in week)
+    return f"Hierdie week vs verlede week: {this} vs {last}"
+
+def _timing_line(b):
+    """'Meeste verkope: Dinsdae, 19:00–20:00' (None when off or nothing folded yet)."""
+    t = b.get("timing")
+    if not t:
+        return None
+    h = t["hour"]
+    return f"Meeste verkope: {_DAYS[t['weekday']][:-1]}e, {h:02d}:00–{(h + 1) % 24:02d}:00"
+
+def _name_line(b) -> str:
+    """Event name, with '(data van 23h50)' when the figures come from an earlier fetch."""
+    if b.get("archived"):
+        return f"{b['name']} (show was {b['archived']}; finale syfers)"
+    return f"{b['name']} (data van {b['stale']})" if b.get("stale") else f"{b['name']}"
+
+def _progress_lines(b):
+    """Yesterday / week / timing / days-to-show lines; none for an archived (finished) event."""
+    if b.get("archived"):
+        return []
+    out = [_yday_line(b)]
+    for line in (_week_line(b), _timing_line(b)):
+        if line:
+            out.append(line)
+    if b.get("days_to_event") is not None:
+        out.append(f"dae tot die show: {b['days_to_event']}")
+    return out
+
+_UNAVAILABLE = "Geen data nie (bron onbereikbaar)"
+
 # spoegwolf_daily/summarize_af.py
 
+@traced("summarize_af.build_message")
 def build_message(shows_blocks, tz="Africa/Johannesburg", shopify=None, quicket=None, itickets=None) -> str:
     lines = []
 
     # ===== Shopify first =====
     if shopify:
-        lines.append("🛒 *Shopify Online Store*")
-        lines.append(f"Yesterdays Sales: R{shopify['yesterday_sales']:.2f}")
-        lines.append(f"Sales this week: R{shopify['gross_sales']:.2f}")
-        if shopify.get("top_item"):
-            ti = shopify["top_item"]
-            lines.append(f"Top Selling Item: {ti['title']} (x{ti['qty']})")
+        lines.append("🛒 *Shopify Online Store*" + (f" (data van {shopify['stale']})" if shopify.get("stale") else ""))
+        if shopify.get("windows"):
+            for w in shopify["windows"]:
+                lines.append(f"{w['label']}: R{w['sales']:.2f}")
+        else:
+            lines.append(f"Yesterdays Sales: R{shopify['yesterday_sales']:.2f}")
+            lines.append(f"Sales this week: R{shopify['gross_sales']:.2f}")
+        top = shopify.get("top_items") or ([shopify["top_item"]] if shopify.get("top_item") else [])
+        if len(top) == 1:
+            lines.append(f"Top Selling Item: {top[0]['title']} (x{top[0]['qty']})")
+        elif top:
+            lines.append("Top Selling Items: " + ", ".join(f"{t['title']} (x{t['qty']})" for t in top))
         lines.append("")  # blank line gap
 
     # ===== Plankton (your own shows) =====
     lines.append("🎟️ PLANKTON")
     lines.append("")
     for b in shows_blocks:
-        name = b["name"]; cap = b["capacity"]
+        if b.get("unavailable"):
+            lines += [_name_line(b), _UNAVAILABLE, ""]
+            continue
+        cap = b["capacity"]
         ga = b["ga"]; kids = b["kids"]; goue = b["goue"]
-        total = b["total"]; yday = b.get("yesterday"); days_to = b.get("days_to_event")
+        total = b["total"]
         pct = 0 if cap <= 0 else round(100 * total / cap)
 
-        lines.append(f"{name}")
-        lines.append(f"Gister se verkope: {'NVT' if yday is None else yday}")
-        if days_to is not None:
-            lines.append(f"dae tot die show: {days_to}")
+        lines.append(_name_line(b))
+        lines += _progress_lines(b)
         lines.append(f"GA (Adults): {ga}")
         lines.append(f"Kids Tickets: {kids}")
         if goue:
@@ -50,15 +109,16 @@ def build_message(shows_blocks, tz="Africa/Johannesburg", shopify=None, quicket=
         lines.append("🎟️ QUICKET")
         lines.append("")
         for b in quicket:
-            name = b["name"]; cap = b["capacity"]
+            if b.get("unavailable"):
+                lines += [_name_line(b), _UNAVAILABLE, ""]
+                continue
+            cap = b["capacity"]
             ga = b["ga"]; kids = b["kids"]; goue = b["goue"]
-            total = b["total"]; yday = b.get("yesterday"); days_to = b.get("days_to_event")
+            total = b["total"]
             pct = 0 if cap <= 0 else round(100 * total / cap)
 
-            lines.append(f"{name}")
-            lines.append(f"Gister se verkope: {'NVT' if yday is None else yday}")
-            if days_to is not None:
-                lines.append(f"dae tot die show: {days_to}")
+            lines.append(_name_line(b))
+            lines += _progress_lines(b)
             lines.append(f"GA (Adults): {ga}")
             lines.append(f"Kids Tickets: {kids}")
             if goue:
@@ -72,19 +132,17 @@ def build_message(shows_blocks, tz="Africa/Johannesburg", shopify=None, quicket=
         lines.append("🎟️ *iTickets shows*")
         lines.append("")
         for b in itickets:
-            name = b["name"]
+            if b.get("unavailable"):
+                lines += [_name_line(b), _UNAVAILABLE, ""]
+                continue
             cap = int(b.get("capacity", 0))
-            yday = b.get("yesterday")
-            days_to = b.get("days_to_event")
 
             normal = int(b.get("normal", 0))
             vip = int(b.get("vip", 0))
             total = int(b.get("total", normal + vip))
 
-            lines.append(f"{name}")
-            lines.append(f"Gister se verkope: {'NVT' if yday is None else yday}")
-            if days_to is not None:
-                lines.append(f"dae tot die show: {days_to}")
+            lines.append(_name_line(b))
+            lines += _progress_lines(b)
             lines.append(f"Normal: {normal}")
             lines.append(f"VIP: {vip}")
             lines.append(f"Total Sold: {total}")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Rebuild the cumulative daily sales series for an event from one guest-list scan.
+
+Streams the Quicket guest list (or an iTickets CSV) once, classifies each row the same
+way the live summaries do, buckets purchase timestamps into local (TZ) days and writes
+cumulative totals for every day of the on-sale period into the snapshot store in one batch.
+
+Usage:
+  python -m spoegwolf_daily.tools.backfill_history quicket 342395 --dry-run
+  python -m spoegwolf_daily.tools.backfill_history itickets 485051 --csv export.csv
+  python -m spoegwolf_daily.tools.backfill_history quicket 342395 --overwrite --until 2025-12-01
+
+By default only dates missing from the store are written: recorded nightly snapshots
+also reflect refunds/voids at the time, which a rebuild from today's guest list can't.
+"""
+
+from __future__ import annotations
+import os, csv, argparse
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, Iterable, Optional, Tuple
+import pytz
+
+from ..config import CFG, QUICKET_EVENTS, ITICKETS_EVENTS
+from ..snapshot_store import load_snapshots, save_snapshots
+# First field present on the first row wins (override with --ts-field)
+from ..guest_table import local_seconds, QUICKET_TS_FIELDS, ITICKETS_TS_FIELDS
+
+_EPOCH = date(1970, 1, 1)
+
+
+def local_day(ts: Any, tz_name: str) -> Optional[str]:
+    """Purchase timestamp -> local 'YYYY-MM-DD' (None if unparseable); see guest_table.local_seconds."""
+    secs = local_seconds(ts, tz_name)
+    return (_EPOCH + timedelta(days=secs // 86400)).isoformat() if secs > 0 else None
+
+def _pick_field(row: Dict[str, Any], candidates: Tuple[str, ...]) -> Optional[str]:
+    for k in candidates:
+        if row.get(k):
+            return k
+    return None
+
+def bucket_days(rows: Iterable[Dict[str, Any]], classify, tz_name: str,
+                ts_fields: Tuple[str, ...]) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    One pass: {day: included sales} plus stats {'rows','included','no_timestamp'}.
+    classify(row) returns a group name, 'excluded', or None (invalid/void).
+    """
+    per_day: Dict[str, int] = {}
+    stats = {"rows": 0, "included": 0, "no_timestamp": 0}
+    field = None
+    for row in rows:
+        stats["rows"] += 1
+        bucket = classify(row)
+        if bucket is None or bucket == "excluded":
+            continue
+        if field is None:
+            field = _pick_field(row, ts_fields)
+            if field is None:
+                raise RuntimeError(f"No purchase timestamp column found (tried {', '.join(ts_fields)}); use --ts-field")
+        day = local_day(row.get(field), tz_name)
+        if day is None:
+            stats["no_timestamp"] += 1
+            continue
+        per_day[day] = per_day.get(day, 0) + 1
+        stats["included"] += 1
+    return per_day, stats
+
+def cumulative_series(per_day: Dict[str, int], until: date, start: Optional[date] = None) -> Dict[str, int]:
+    """Running total for every day from the first sale (or start) through until, gaps filled."""
+    if not per_day:
+        return {}
+    first = start or date.fromisoformat(min(per_day))
+    out: Dict[str, int] = {}
+    running = sum(n for d, n in per_day.items() if d < first.isoformat())
+    d = first
+    while d <= until:
+        key = d.isoformat()
+        running += per_day.get(key, 0)
+        out[key] = running
+        d += timedelta(days=1)
+    return out
+
+def diff_against_store(key: str, series: Dict[str, int]):
+    """[(date, stored or None, rebuilt)] for dates where they differ."""
+    snaps = load_snapshots(key)
+    return [(d, snaps.get(d), v) for d, v in sorted(series.items()) if snaps.get(d) != v]
+
+# -------------------- sources --------------------
+
+def _quicket_rows(event_id: int):
+    from ..data_sources.quicket import iter_all_guests, classify_guest, _group_sets
+    ev = next((e for e in QUICKET_EVENTS if int(e["id"]) == int(event_id)), None)
+    groups = (ev or {}).get("groups", {})
+    sets = _group_sets(groups)
+    return iter_all_guests(int(event_id)), (lambda g: classify_guest(g, sets)), QUICKET_TS_FIELDS
+
+def _itickets_rows(eid: str, csv_path: Optional[str]):
+    from ..data_sources.itickets import fetch_itickets_csv_via_curl, classify_row
+    if csv_path:
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        ev = next((e for e in ITICKETS_EVENTS if str(e["eid"]) == str(eid)), None)
+        if ev is None:
+            raise RuntimeError(f"iTickets event {eid} not in ITICKETS_EVENTS; pass --csv")
+        url = os.getenv(ev["feed_url_env"], "")
+        if not url:
+            raise RuntimeError(f"Missing env var for iTickets feed URL: {ev['feed_url_env']}")
+        rows = fetch_itickets_csv_via_curl(url)
+    return rows, classify_row, ITICKETS_TS_FIELDS
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Rebuild daily snapshot history from one guest-list scan")
+    ap.add_argument("source", choices=["quicket", "itickets"])
+    ap.add_argument("event", help="Quicket event id or iTickets eid")
+    ap.add_argument("--csv", help="iTickets: read this CSV export instead of the feed URL")
+    ap.add_argument("--ts-field", help="Purchase timestamp field/column name")
+    ap.add_argument("--until", help="Last day to write (YYYY-MM-DD, default: yesterday)")
+    ap.add_argument("--overwrite", action="store_true", help="Replace stored values too, not only missing dates")
+    ap.add_argument("--dry-run", action="store_true", help="Print the diff against the store, write nothing")
+    args = ap.parse_args(argv)
+
+    tz = CFG["TZ"]
+    until = (date.fromisoformat(args.until) if args.until
+             else datetime.now(pytz.timezone(tz)).date() - timedelta(days=1))
+
+    if args.source == "quicket":
+        rows, classify, fields = _quicket_rows(int(args.event))
+    else:
+        rows, classify, fields = _itickets_rows(args.event, args.csv)
+    if args.ts_field:
+        fields = (args.ts_field,)
+
+    key = f"{args.source}:{args.event}"
+    per_day, stats = bucket_days(rows, classify, tz, fields)
+    series = cumulative_series(per_day, until)
+    print(f"[backfill] {key}: {stats['rows']} rows, {stats['included']} included, "
+          f"{stats['no_timestamp']} without timestamp, {len(series)} days")
+
+    diff = diff_against_store(key, series)
+    if not args.overwrite:
+        diff = [x for x in diff if x[1] is None]
+    for d, old, new in diff:
+        print(f"  {d}: {'-' if old is None else old} -> {new}")
+
+    if args.dry_run:
+        print(f"[dry-run] {len(diff)} dates would change")
+        return 0
+    written = save_snapshots(key, {d: new for d, _, new in diff})
+    print(f"Done. Dates written: {len(written)}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
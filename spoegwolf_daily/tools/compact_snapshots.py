@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Fold data/snapshots/<key>.log into a compact data/snapshots/<key>.json base.
+
+Usage:
+  python -m spoegwolf_daily.tools.compact_snapshots            # every key with a log
+  python -m spoegwolf_daily.tools.compact_snapshots quicket:342395
+  python -m spoegwolf_daily.tools.compact_snapshots --all      # also rewrite logless bases compactly
+                                                               # and rebuild the weekly/monthly rollups
+"""
+
+from __future__ import annotations
+import os, sys
+
+from ..snapshot_store import list_keys, compact, base_json, transaction, rebuild_rollup, _snap_path
+
+def _rewrite_base(key: str) -> bool:
+    p = _snap_path(key)
+    with transaction():
+        compacted = base_json(key)
+        with open(p, "r", encoding="utf-8") as f:
+            if f.read() == compacted:
+                return False
+        with open(p, "w", encoding="utf-8") as f:
+            f.write(compacted)
+    return True
+
+def main(argv=None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    rewrite_all = "--all" in args
+    keys = [a for a in args if not a.startswith("--")] or list_keys()
+
+    changes = 0
+    for key in keys:
+        if compact(key):
+            changes += 1
+            print(f"[compact] {key}")
+        elif rewrite_all and os.path.exists(_snap_path(key)) and _rewrite_base(key):
+            changes += 1
+            print(f"[rewrite] {key}")
+        if rewrite_all:
+            rebuild_rollup(key)
+    print(f"Done. Keys compacted: {changes}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
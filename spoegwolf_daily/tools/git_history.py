@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Rebuild the snapshot audit index from git history.
+
+The nightly workflow commits data/snapshots on every change, so git remembers when each
+total was recorded, including values a later run overwrote. This walks that history once:
+one `git log --raw` for the commit list and one `git cat-file --batch` process for every
+blob, fed from a thread while the main thread parses. For each commit it diffs the merged
+base + log view per key and appends the changed days to <SNAP_DIR>/audit/<key>.log.
+
+Usage:
+  python -m spoegwolf_daily.tools.git_history             # only commits since the last run
+  python -m spoegwolf_daily.tools.git_history --rebuild   # from the first commit
+  python -m spoegwolf_daily.tools.git_history --show quicket:342395
+
+Needs full history (actions/checkout with fetch-depth: 0).
+"""
+
+from __future__ import annotations
+import os, json, argparse, threading, subprocess
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import pytz
+
+from ..config import CFG
+from ..snapshot_store import _dir, _audit_dir, append_audit, load_audit, clear_audit
+
+ZERO = "0" * 40
+
+def _git(*args: str) -> str:
+    r = subprocess.run(["git", *args], capture_output=True, text=True)
+    if r.returncode != 0:
+        raise RuntimeError(f"git {args[0]} failed: {r.stderr.strip()}")
+    return r.stdout
+
+def _commits(prefix: str, since: Optional[str]) -> List[Tuple[str, int, List[Tuple[str, str, str]]]]:
+    """[(commit, commit time, [(path, old blob, new blob)])], oldest first, snapshot files only."""
+    fmt = "--format=%x00%H %ct"
+    rng = [f"{since}..HEAD"] if since else ["HEAD"]
+    out = _git("log", "--reverse", "--raw", "--no-abbrev", "--no-renames", "--first-parent",
+               fmt, *rng, "--", prefix or ".")
+    commits = []
+    for chunk in out.split("\0")[1:]:
+        lines = chunk.splitlines()
+        sha, ct = lines[0].split()
+        files = []
+        for line in lines[1:]:
+            if not line.startswith(":"):
+                continue
+            meta, path = line.split("\t", 1)
+            _, _, old, new, _ = meta[1:].split(" ")
+            if os.path.dirname(path) == prefix and path.endswith((".json", ".log")):
+                files.append((path, old, new))
+        if files:
+            commits.append((sha, int(ct), files))
+    return commits
+
+def _blobs(shas: List[str]):
+    """Yield the contents of each blob in order, via one cat-file process."""
+    proc = subprocess.Popen(["git", "cat-file", "--batch"], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def feed():
+        try:
+            for sha in shas:
+                proc.stdin.write(sha.encode() + b"\n")
+            proc.stdin.close()
+        except BrokenPipeError:  # reader stopped early
+            pass
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    try:
+        for sha in shas:
+            header = proc.stdout.readline().split()
+            if len(header) < 3 or header[1] != b"blob":
+                raise RuntimeError(f"git cat-file: no blob {sha}")
+            data = proc.stdout.read(int(header[2]))
+            proc.stdout.read(1)  # trailing newline
+            yield data
+    finally:
+        proc.stdout.close()
+        writer.join()
+        proc.wait()
+
+def _parse_log(data: bytes, out: Dict[str, int]) -> List[str]:
+    """Fold log lines into out; returns the dates seen. One json.loads for the whole chunk."""
+    lines = [ln for ln in data.decode("utf-8", errors="replace").splitlines() if ln.strip()]
+    try:
+        rows = json.loads("[" + ",".join(lines) + "]")
+    except ValueError:  # a torn line somewhere: go line by line
+        rows = []
+        for ln in lines:
+            try:
+                rows.append(json.loads(ln))
+            except ValueError:
+                continue
+    days = []
+    for row in rows:
+        try:
+            out[row[0]] = int(row[1])
+            days.append(row[0])
+        except (ValueError, TypeError, IndexError, KeyError):
+            continue
+    return days
+
+def _parse_base(data: bytes) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    try:
+        base = json.loads(data)
+    except ValueError:
+        return out
+    if isinstance(base, dict):
+        for d, v in base.items():
+            try:
+                out[d] = int(v[0] if isinstance(v, list) else v)
+            except (ValueError, TypeError, IndexError):
+                continue
+    return out
+
+def _version(path: str, data: bytes, prev: Optional[Tuple[bytes, Dict[str, int]]]) -> Tuple[Tuple[bytes, Dict[str, int]], set]:
+    """
+    (raw, {date: total}) for a new version of a snapshot file, plus the dates that changed.
+    Logs only grow between compactions, so usually just the appended tail is parsed.
+    """
+    before = prev[1] if prev else {}
+    if path.endswith(".log"):
+        if prev and data.startswith(prev[0]):
+            after = dict(before)
+            days = {d for d in _parse_log(data[len(prev[0]):], after) if before.get(d) != after[d]}
+            return (data, after), days
+        after = {}
+        _parse_log(data, after)
+    else:
+        after = _parse_base(data)
+    days = {d for d in after if before.get(d) != after[d]} | (before.keys() - after.keys())
+    return (data, after), days
+
+def index(rebuild: bool = False) -> int:
+    """Append audit rows for every unindexed snapshot commit; returns the number of rows."""
+    top = _git("rev-parse", "--show-toplevel").strip()
+    prefix = os.path.relpath(os.path.abspath(_dir()), top).replace(os.sep, "/")
+    prefix = "" if prefix == "." else prefix
+    head_p = os.path.join(_audit_dir(), "HEAD")
+
+    since = None
+    if not rebuild and os.path.exists(head_p):
+        with open(head_p, "r", encoding="utf-8") as f:
+            since = f.read().strip() or None
+        if since and subprocess.run(["git", "merge-base", "--is-ancestor", since, "HEAD"],
+                                    capture_output=True).returncode != 0:
+            print(f"[history] {since[:12]} is not in HEAD's history; rebuilding")
+            since = None
+    if since is None:
+        clear_audit()
+
+    commits = _commits(prefix, since)
+    # Blob order = consumption order: a path's previous version (incremental runs only) right
+    # before its first change, then every new version. Deleted files have no blob.
+    order: List[Tuple[int, str, str]] = []  # (commit index, path, blob); index -1 = baseline
+    seen = set()
+    for i, (_, _, files) in enumerate(commits):
+        for path, old, new in files:
+            if path not in seen:
+                seen.add(path)
+                if old != ZERO:
+                    order.append((-1, path, old))
+            if new != ZERO:
+                order.append((i, path, new))
+
+    tz = pytz.timezone(CFG["TZ"])
+    files: Dict[str, Tuple[bytes, Dict[str, int]]] = {}  # path -> current version (raw, {date: total})
+    last: Dict[str, Dict[str, int]] = {}         # key -> {date: last indexed total}
+    rows: Dict[str, List[Tuple[str, str, int, str]]] = {}
+    blobs = _blobs([sha for _, _, sha in order])
+    pos = 0
+
+    def known(key: str) -> Dict[str, int]:
+        if key not in last:
+            last[key] = {day: total for _, day, total, _ in load_audit(key)}
+        return last[key]
+
+    for i, (sha, ct, changed) in enumerate(commits):
+        touched: Dict[str, set] = {}
+        for path, old, new in changed:
+            if pos < len(order) and order[pos][0] == -1:  # baseline of a path changed here
+                files[path] = _version(path, next(blobs), None)[0]
+                pos += 1
+            prev = files.get(path)
+            if new == ZERO:
+                files[path] = (b"", {})
+                days = set(prev[1]) if prev else set()
+            else:
+                files[path], days = _version(path, next(blobs), prev)
+                pos += 1
+            touched.setdefault(os.path.basename(path).rsplit(".", 1)[0], set()).update(days)
+
+        stamp = datetime.fromtimestamp(ct, tz).isoformat(timespec="seconds")
+        for key, days in touched.items():
+            base = files.get(f"{prefix}/{key}.json" if prefix else f"{key}.json", (b"", {}))[1]
+            log = files.get(f"{prefix}/{key}.log" if prefix else f"{key}.log", (b"", {}))[1]
+            prev = known(key)
+            for d in sorted(days):
+                total = log.get(d, base.get(d))
+                if total is not None and prev.get(d) != total:
+                    prev[d] = total
+                    rows.setdefault(key, []).append((stamp, d, total, sha[:12]))
+    for _ in blobs:  # drain so cat-file exits cleanly
+        pass
+
+    for key, key_rows in rows.items():
+        append_audit(key, key_rows)
+    os.makedirs(_audit_dir(), exist_ok=True)
+    with open(head_p, "w", encoding="utf-8") as f:
+        f.write(_git("rev-parse", "HEAD").strip() + "\n")
+    n = sum(len(r) for r in rows.values())
+    print(f"[history] {len(commits)} commits, {n} values indexed across {len(rows)} keys")
+    return n
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Index every committed snapshot value from git history")
+    ap.add_argument("--rebuild", action="store_true", help="drop the index and walk all history")
+    ap.add_argument("--show", metavar="KEY", help="print the indexed history of one key")
+    args = ap.parse_args(argv)
+    if args.show:
+        for ts, day, total, commit in load_audit(args.show):
+            print(f"{ts}  {day}  {total:>6}  {commit}")
+        return 0
+    index(rebuild=args.rebuild)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Peak-memory budgets for each source's fetch + summarize path.
+
+Starts a synthetic feed server in a child process (so its allocations don't count), points
+the Quicket / iTickets / Shopify / Plankton clients at it and runs every stage at increasing
+feed sizes. For each stage it reports the tracemalloc peak and the sampled RSS growth, then
+fails when the peak at the largest size exceeds the stage budget or when peak memory grows
+faster than the allowed bytes per row (the slope between the smallest and largest size) —
+i.e. when something starts buffering a whole dataset that used to stream.
+
+Usage:
+  python -m spoegwolf_daily.tools.memcheck
+  python -m spoegwolf_daily.tools.memcheck --sizes 2000,10000,50000 --stage quicket.summarize_event
+  python -m spoegwolf_daily.tools.memcheck --json memcheck.json
+
+Budgets: MEMCHECK_PEAK_MB_<STAGE> and MEMCHECK_SLOPE_<STAGE> (bytes per row), with STAGE
+upper-cased and dots as underscores, e.g. MEMCHECK_SLOPE_ITICKETS_FETCH_SUMMARIZE=3000.
+"""
+
+from __future__ import annotations
+import os, re, json, argparse, threading, tracemalloc, multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+# stage -> (peak MB at the largest size, bytes per row)
+DEFAULT_BUDGETS = {
+    "plankton.get_event_summary": (4, 64),
+    "quicket.summarize_event": (8, 64),       # streams page by page
+    "quicket.event_date": (8, 64),            # first page only
+    "itickets.fetch_summarize": (24, 600),    # the CSV text is held (curl output + str, ~400 B/row)
+    "shopify.fetch_orders": (96, 2800),       # the order list is the result (~1.4 KB/order)
+}
+DEFAULT_SIZES = "2000,8000,32000"
+
+# -------------------- synthetic feeds (child process) --------------------
+
+def _guest(i: int) -> Dict[str, Any]:
+    return {
+        "TicketId": 1_000_000 + i, "OrderId": 500_000 + i // 3, "Barcode": f"QK{i:010d}",
+        "FirstName": "Guest", "LastName": f"Number{i}", "Email": f"guest{i}@example.com",
+        "TicketType": ("Kids Under 13", "Fase Een", "Fase Twee", "Complimentary")[i % 4],
+        "Valid": i % 29 != 0, "PurchaseDate": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d} 10:{i % 60:02d}:00",
+        "TicketInformation": {"EventDate": "2026-12-18 14:00:00", "Price": 250.0, "Seat": None},
+    }
+
+def _csv(n: int) -> bytes:
+    lines = ["id,type,VOID,purchase_date,name,email,order_id,price"]
+    lines += [f"{i},{'VIP' if i % 7 == 0 else 'Normal'},{1 if i % 31 == 0 else 0},"
+              f"2025-{1 + i % 12:02d}-{1 + i % 28:02d} 09:00:00,Guest {i},guest{i}@example.com,{80000 + i},350"
+              for i in range(n)]
+    return ("\n".join(lines) + "\n").encode()
+
+def _order(i: int) -> Dict[str, Any]:
+    return {
+        "id": 9_000_000 + i, "created_at": f"2025-11-{1 + i % 28:02d}T10:00:00+02:00",
+        "updated_at": f"2025-11-{1 + i % 28:02d}T11:00:00+02:00", "currency": "ZAR",
+        "current_subtotal_price": "450.00", "subtotal_price": "450.00", "total_line_items_price": "450.00",
+        "financial_status": "paid", "cancelled_at": None,
+        "line_items": [{"title": "T-Shirt", "quantity": 1, "price": "300.00"},
+                       {"title": "Cap", "quantity": 1, "price": "150.00"}],
+    }
+
+class _Feeds(BaseHTTPRequestHandler):
+    def log_message(self, *a):
+        pass
+
+    def _send(self, body: bytes, ctype: str = "application/json", headers: Optional[Dict[str, str]] = None):
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        u = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(u.query).items()}
+        m = re.match(r"/api/events/(\d+)/guests$", u.path)
+        if m:  # Quicket: the event id is the guest count
+            n, page, size = int(m.group(1)), int(q.get("page", 1)), int(q.get("pagesize", 500))
+            rows = [_guest(i) for i in range((page - 1) * size, min(n, page * size))]
+            return self._send(json.dumps({"results": rows, "pages": max(1, -(-n // size))}).encode())
+        if u.path == "/itickets.csv":
+            return self._send(_csv(int(q["n"])), "text/csv")
+        m = re.match(r"/shopify/(\d+)/orders.json$", u.path)
+        if m:
+            n, page, size = int(m.group(1)), int(q.get("page_info", 1)), 250
+            headers = {}
+            if page * size < n:
+                headers["Link"] = f'<http://{self.headers["Host"]}{u.path}?page_info={page + 1}>; rel="next"'
+            orders = [_order(i) for i in range((page - 1) * size, min(n, page * size))]
+            return self._send(json.dumps({"orders": orders}).encode(), headers=headers)
+        if u.path.startswith("/api/v2/events/summary/"):
+            tinfo = [{"ticketName": f"Type {i}", "ticketsIssued": i} for i in range(40)]
+            return self._send(json.dumps({"TicketInfo": tinfo, "EventDate": "2026-12-01T10:00:00"}).encode())
+        self.send_error(404)
+
+def _serve(port_q):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Feeds)
+    port_q.put(srv.server_port)
+    srv.serve_forever()
+
+# -------------------- measurement --------------------
+
+def _rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+def measure(fn: Callable[[], Any]) -> Tuple[int, int]:
+    """(tracemalloc peak above the starting point, peak RSS growth sampled every 5 ms)."""
+    start_rss = _rss()
+    peak_rss = [start_rss]
+    done = threading.Event()
+    def sample():
+        while not done.wait(0.005):
+            peak_rss[0] = max(peak_rss[0], _rss())
+    t = threading.Thread(target=sample, daemon=True)
+    t.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    done.set()
+    t.join()
+    del result
+    return peak, max(0, max(peak_rss[0], _rss()) - start_rss)
+
+def _stages(base: str) -> Dict[str, Callable[[int], Callable[[], Any]]]:
+    from ..config import CFG
+    from ..data_sources import plankton, quicket, itickets, shopify
+    CFG.update(QUICKET_API_KEY="memcheck", QUICKET_USERTOKEN="memcheck", PLANKTON_AUTH="Bearer memcheck",
+               SHOPIFY_BASE="memcheck", SHOPIFY_ACCESS_TOKEN="memcheck")
+    plankton.BASE = quicket.BASE = base
+    groups = {"Adults": ["Fase Een", "Fase Twee"], "Kids": ["Kids Under 13"], "exclude": ["Complimentary"]}
+    size_ref = {"n": 0}
+    shopify._orders_url = lambda: f"{base}/shopify/{size_ref['n']}/orders.json"
+
+    def shop(n):
+        size_ref["n"] = n
+        return lambda: shopify._fetch_orders("2025-11-01T00:00:00Z", "2025-11-30T00:00:00Z")
+
+    return {
+        "plankton.get_event_summary": lambda n: lambda: plankton.get_event_summary("memcheck"),
+        "quicket.summarize_event": lambda n: lambda: quicket.summarize_event(n, groups),
+        "quicket.event_date": lambda n: lambda: quicket.get_event_date_first_page(n, "Africa/Johannesburg"),
+        "itickets.fetch_summarize": lambda n: lambda: itickets.summarize_itickets_feed(f"{base}/itickets.csv?n={n}"),
+        "shopify.fetch_orders": shop,
+    }
+
+def _budget(stage: str) -> Tuple[float, float]:
+    env = re.sub(r"\W", "_", stage).upper()
+    peak_mb, slope = DEFAULT_BUDGETS[stage]
+    return (float(os.getenv(f"MEMCHECK_PEAK_MB_{env}", peak_mb)), float(os.getenv(f"MEMCHECK_SLOPE_{env}", slope)))
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Peak-memory budgets per source stage")
+    ap.add_argument("--sizes", default=os.getenv("MEMCHECK_SIZES", DEFAULT_SIZES), help="comma-separated row counts")
+    ap.add_argument("--stage", action="append", help="only these stages (repeatable)")
+    ap.add_argument("--json", help="also write the results here")
+    args = ap.parse_args(argv)
+    sizes = sorted(int(s) for s in args.sizes.split(",") if s.strip())
+
+    port_q = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(port_q,), daemon=True)
+    server.start()
+    base = f"http://127.0.0.1:{port_q.get(timeout=10)}"
+
+    stages = _stages(base)
+    wanted = args.stage or list(stages)
+    unknown = [s for s in wanted if s not in stages]
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(unknown)} (have {', '.join(stages)})")
+
+    tracemalloc.start()
+    results: List[Dict[str, Any]] = []
+    failures = []
+    try:
+        for stage in wanted:
+            stages[stage](sizes[0])()  # warm-up: imports, sessions, connection pool
+            points = []
+            for n in sizes:
+                peak, rss = measure(stages[stage](n))
+                points.append({"rows": n, "peak": peak, "rss": rss})
+                print(f"[memcheck] {stage:<28} rows={n:<7} peak={peak / 1e6:8.2f} MB  rss+={rss / 1e6:8.2f} MB")
+            slope = ((points[-1]["peak"] - points[0]["peak"]) / (sizes[-1] - sizes[0])) if len(sizes) > 1 else 0.0
+            max_mb, max_slope = _budget(stage)
+            ok = points[-1]["peak"] <= max_mb * 1e6 and slope <= max_slope
+            print(f"[memcheck] {stage:<28} slope={slope:8.1f} B/row (max {max_slope:g})  "
+                  f"peak budget {max_mb:g} MB  {'OK' if ok else 'FAIL'}")
+            results.append({"stage": stage, "points": points, "slope": slope,
+                            "budget_mb": max_mb, "budget_slope": max_slope, "ok": ok})
+            if not ok:
+                failures.append(stage)
+    finally:
+        tracemalloc.stop()
+        server.terminate()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+    if failures:
+        print(f"[memcheck] over budget: {', '.join(failures)}")
+        return 1
+    print("[memcheck] all stages within budget")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
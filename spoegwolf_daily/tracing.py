@@ -0,0 +1,128 @@
+# spoegwolf_daily/tracing.py
+"""
+Minimal span tracing with Chrome / Perfetto trace export.
+
+  @traced()                         # or @traced("quicket.page")
+  def summarize_event(...): ...
+
+  with span("quicket.decode", page=3):
+      js = r.json()
+
+Spans are "complete" events (ph "X") with thread ids, so nesting shows up per thread in
+chrome://tracing or ui.perfetto.dev. Turn on with `--trace out.json` (main, cron_snapshot)
+or TRACE_FILE=out.json. When off, span() returns a shared no-op and traced functions cost one
+global check per call; traced generators are handed back untouched.
+"""
+from __future__ import annotations
+import os, json, time, atexit, inspect, functools, threading
+from typing import Dict, Any, List, Optional, Callable
+
+_ON = False
+_T0 = 0.0
+_EVENTS: List[Dict[str, Any]] = []
+_THREADS: Dict[int, str] = {}
+_LOCK = threading.Lock()
+
+
+class _Noop:
+    __slots__ = ()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _Noop()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        t = threading.current_thread()
+        args = {k: str(v) for k, v in self.args.items()}
+        if exc_type is not None and exc_type is not GeneratorExit:
+            args["error"] = exc_type.__name__
+        ev = {"name": self.name, "ph": "X", "pid": os.getpid(), "tid": t.ident,
+              "ts": round((self.start - _T0) * 1e6, 1), "dur": round((end - self.start) * 1e6, 1)}
+        if args:
+            ev["args"] = args
+        with _LOCK:
+            _EVENTS.append(ev)
+            _THREADS.setdefault(t.ident, t.name)
+        return False
+
+
+def enabled() -> bool:
+    return _ON
+
+def span(name: str, **args):
+    """Context manager timing a block (a no-op unless tracing is on)."""
+    if not _ON:
+        return _NOOP
+    return _Span(name, args)
+
+def _iter_span(name: str, it):
+    with _Span(name, {}):
+        return (yield from it)
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator; generator functions are timed from first next() to exhaustion."""
+    def deco(fn):
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*a, **kw):
+                if not _ON:
+                    return fn(*a, **kw)
+                return _iter_span(label, fn(*a, **kw))
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if not _ON:
+                return fn(*a, **kw)
+            with _Span(label, {}):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+def start(path: Optional[str] = None):
+    """Start collecting; with a path, the trace is written there at interpreter exit."""
+    global _ON, _T0
+    with _LOCK:
+        _EVENTS.clear()
+        _THREADS.clear()
+    _T0 = time.perf_counter()
+    _ON = True
+    if path:
+        atexit.register(export, path)
+
+def export(path: str) -> int:
+    """Write the Chrome trace JSON; returns the number of spans."""
+    with _LOCK:
+        events = list(_EVENTS)
+        threads = dict(_THREADS)
+    meta = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": tname}}
+            for tid, tname in threads.items()]
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": meta + events, "displayTimeUnit": "ms"}, f, separators=(",", ":"))
+    print(f"[trace] {len(events)} spans -> {path}")
+    return len(events)
+
+def configure_from_args(path: Optional[str] = None):
+    """--trace PATH (or env TRACE_FILE)."""
+    path = path or os.getenv("TRACE_FILE")
+    if path:
+        start(path)
@@ -0,0 +1,261 @@
+# spoegwolf_daily/watch.py
+"""
+Watch mode for on-sale launches: python -m spoegwolf_daily.main --watch
+
+One long-lived process: HTTP sessions stay pooled (see httpclient), each source is polled
+on its own interval, totals are updated incrementally (Quicket re-reads only the tail of
+the guest list, iTickets skips re-parsing an unchanged feed), every change is appended to
+data/intraday/<key>.log, and an alert email goes out when an event crosses a capacity
+percentage or sells unusually fast in the last hour. Between polls it just sleeps.
+
+Env knobs:
+  WATCH_INTERVAL_PLANKTON / _QUICKET / _ITICKETS / _SHOPIFY   seconds (300/300/600/900)
+  WATCH_FULL_EVERY        full Quicket rescan every N polls (12)
+  WATCH_ALERT_PCTS        capacity thresholds, e.g. "50,75,90,100"
+  WATCH_ALERT_PER_HOUR    tickets in the last hour that trigger a velocity alert (0 = off)
+"""
+from __future__ import annotations
+import os, json, time, heapq, hashlib, signal
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable
+import pytz
+
+from .config import CFG, SHOWS, QUICKET_EVENTS, ITICKETS_EVENTS, current_tenant, use_tenant, namespaced
+from .data_sources.plankton import get_event_summary
+from .data_sources.quicket import summarize_event_incremental
+from .data_sources.itickets import fetch_itickets_text_via_curl, summarize_itickets_text
+from .snapshot_store import append_intraday
+from .archive import load_archive
+from .senders.emailer import send_email_summary
+
+WATCH_STATE_FILE = os.path.join(os.getenv("CACHE_DIR", "data/cache"), "watch_state.json")
+HOUR = 3600
+
+def _env_int(name: str, default: int) -> int:
+    v = os.getenv(name, "")
+    try:
+        return int(v) if v.strip() != "" else default
+    except Exception:
+        return default
+
+def _env_pcts() -> List[int]:
+    raw = os.getenv("WATCH_ALERT_PCTS", "50,75,90,100")
+    return sorted({int(x) for x in raw.split(",") if x.strip().isdigit()})
+
+def _state_path() -> str:
+    """WATCH_STATE_FILE, or the active tenant's copy (data/cache/<namespace>/watch_state.json)."""
+    return os.path.join(namespaced(os.path.dirname(WATCH_STATE_FILE)), os.path.basename(WATCH_STATE_FILE))
+
+def _load_state() -> Dict[str, Any]:
+    p = _state_path()
+    if not os.path.exists(p):
+        return {}
+    with open(p, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+def _save_state(state: Dict[str, Any]):
+    p = _state_path()
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    with open(p, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+class Tracker:
+    """Latest total for one event, the last hour of points, and which alerts already fired."""
+
+    def __init__(self, key: str, name: str, capacity: int, saved: Dict[str, Any]):
+        self.key = key
+        self.name = name
+        self.capacity = capacity
+        self.total: Optional[int] = None
+        self.points: deque = deque()               # (epoch, total), last hour only
+        self.alerted = set(saved.get("pcts") or [])
+        self.velocity_at = float(saved.get("velocity_at") or 0)
+
+    def saved(self) -> Dict[str, Any]:
+        return {"pcts": sorted(self.alerted), "velocity_at": self.velocity_at}
+
+    def update(self, total: int, now: float, tz: str, pcts: List[int], per_hour: int) -> List[str]:
+        """Record a polled total; returns alert lines (empty if nothing to report)."""
+        first = self.total is None
+        if total != self.total:
+            stamp = datetime.fromtimestamp(now, pytz.timezone(tz)).isoformat(timespec="seconds")
+            append_intraday(self.key, stamp, total)
+        self.total = total
+
+        self.points.append((now, total))
+        while len(self.points) > 1 and self.points[1][0] <= now - HOUR:
+            self.points.popleft()
+
+        alerts: List[str] = []
+        if self.capacity > 0:
+            pct = 100 * total / self.capacity
+            for th in pcts:
+                if th in self.alerted or pct < th:
+                    continue
+                self.alerted.add(th)
+                # thresholds already behind us when the watcher starts are noted, not announced
+                if not first:
+                    alerts.append(f"{th}% van kapasiteit bereik")
+
+        if per_hour > 0 and now - self.velocity_at >= HOUR:
+            since, base = self.points[0]
+            sold = total - base
+            if sold >= per_hour and now - since >= HOUR / 2:
+                self.velocity_at = now
+                alerts.append(f"Verkope die afgelope uur: {sold}")
+        return alerts
+
+
+def _alert(tracker: Tracker, lines: List[str]):
+    cap = tracker.capacity
+    pct = 0 if cap <= 0 else round(100 * (tracker.total or 0) / cap)
+    body = "\n".join([tracker.name, *lines, f"Total Sold: {tracker.total}",
+                      f"Sold Out % (Uit {cap:,}): {pct}%"])
+    print(f"[watch][alert] {tracker.name}: {'; '.join(lines)}")
+    try:
+        send_email_summary(f"{CFG.get('REPORT_TITLE') or 'Spoegwolf'} Alert — {tracker.name}: {lines[0]}", body)
+    except Exception as e:
+        print(f"[WARN] alert email failed: {e}")
+
+
+def _plankton_poll(show: Dict[str, Any]) -> Callable[[], Optional[int]]:
+    from .main import _sum_by_names
+    groups = show.get("groups", {})
+
+    def poll() -> Optional[int]:
+        tinfo = get_event_summary(show["event_guid"]).get("TicketInfo", [])
+        return sum(_sum_by_names(tinfo, groups.get(g)) for g in ("GA (Adults)", "Kids Tickets", "Goue Kraal"))
+    return poll
+
+def _quicket_poll(ev: Dict[str, Any]) -> Callable[[], Optional[int]]:
+    state: Dict[str, Any] = {}
+    polls = [0]
+    full_every = max(1, _env_int("WATCH_FULL_EVERY", 12))
+
+    def poll() -> Optional[int]:
+        polls[0] += 1
+        if polls[0] % full_every == 0:
+            state.clear()
+        return int(summarize_event_incremental(int(ev["id"]), ev.get("groups", {}), state)["total"])
+    return poll
+
+def _itickets_poll(ev: Dict[str, Any]) -> Callable[[], Optional[int]]:
+    from .main import itickets_feed_url
+    last = {"hash": None}
+
+    def poll() -> Optional[int]:
+        text = fetch_itickets_text_via_curl(itickets_feed_url(ev))
+        h = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        if h == last["hash"]:
+            return None  # unchanged feed, nothing to parse
+        last["hash"] = h
+        return int(summarize_itickets_text(text)["total_sold"])
+    return poll
+
+def _shopify_poll() -> Callable[[], Optional[int]]:
+    from .data_sources.shopify import sync_order_store
+
+    def poll() -> Optional[int]:
+        sync_order_store()  # incremental; keeps the local order store current
+        return None
+    return poll
+
+
+def _build_jobs(saved: Dict[str, Any]) -> List[Dict[str, Any]]:
+    jobs = []
+
+    def add(source: str, key: str, name: str, capacity: int, poll, default_interval: int):
+        jobs.append({
+            "source": source,
+            "name": name,
+            "interval": max(5, _env_int(f"WATCH_INTERVAL_{source.upper()}", default_interval)),
+            "poll": poll,
+            "tracker": Tracker(key, name, capacity, saved.get(key) or {}) if key else None,
+        })
+
+    def live(events, key_of):
+        return [ev for ev in events if load_archive(key_of(ev)) is None]
+
+    for show in live(SHOWS, lambda s: s["event_guid"]):
+        add("plankton", show["event_guid"], show["name"], int(show.get("capacity", 0)), _plankton_poll(show), 300)
+    for ev in live(QUICKET_EVENTS, lambda e: f"quicket:{e['id']}"):
+        add("quicket", f"quicket:{ev['id']}", ev["name"], int(ev.get("capacity", 0)), _quicket_poll(ev), 300)
+    for ev in live(ITICKETS_EVENTS, lambda e: f"itickets:{e['eid']}"):
+        add("itickets", f"itickets:{ev['eid']}", ev["name"], int(ev.get("capacity", 0)), _itickets_poll(ev), 600)
+    if CFG.get("SHOPIFY_BASE") and CFG.get("SHOPIFY_ACCESS_TOKEN"):
+        add("shopify", "", "Shopify", 0, _shopify_poll(), 900)
+    return jobs
+
+
+def _poll_once(job: Dict[str, Any], saved: Dict[str, Any], pcts: List[int], per_hour: int):
+    """Poll one job and act on the result; runs with the job's tenant active."""
+    try:
+        total = job["poll"]()
+    except Exception as e:
+        # back off a failing source: double its own delay per failure, up to an hour
+        job["backoff"] = min(job.get("backoff", job["interval"]) * 2, 3600)
+        print(f"[WARN] watch {job['source']} {job['name']}: {e} (retry in {job['backoff']}s)")
+        return
+    job.pop("backoff", None)
+    tr = job["tracker"]
+    if tr is None or total is None:
+        return
+    if total != tr.total:
+        print(f"[watch][{job['source']}] {job['name']} = {total}")
+    alerts = tr.update(total, time.time(), CFG["TZ"], pcts, per_hour)
+    if alerts:
+        _alert(tr, alerts)
+    if tr.saved() != saved.get(tr.key):
+        saved[tr.key] = tr.saved()
+        _save_state(saved)
+
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+def run_watch(tenants=None) -> int:
+    """
+    One loop for every tenant's jobs; each poll, alert and state write runs with its own
+    tenant active, so credentials, recipients and data/ paths never cross over.
+    """
+    pcts = _env_pcts()
+    per_hour = _env_int("WATCH_ALERT_PER_HOUR", 0)
+    saved: Dict[str, Dict[str, Any]] = {}
+    jobs: List[Dict[str, Any]] = []
+    for tenant in tenants or [current_tenant()]:
+        with use_tenant(tenant):
+            saved[tenant.name] = _load_state()
+            for job in _build_jobs(saved[tenant.name]):
+                job["tenant"] = tenant
+                jobs.append(job)
+    if not jobs:
+        print("[watch] nothing configured to watch")
+        return 1
+
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"[watch] {len(jobs)} jobs; thresholds {pcts}%, velocity {per_hour or 'off'}/h")
+
+    # (next due, job index); stagger the first round so sources don't all fire at once
+    start = time.time()
+    queue = [(start + i * 0.5, i) for i in range(len(jobs))]
+    heapq.heapify(queue)
+    try:
+        while True:
+            due, i = queue[0]
+            wait = due - time.time()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            heapq.heappop(queue)
+            job = jobs[i]
+            with use_tenant(job["tenant"]):
+                _poll_once(job, saved[job["tenant"].name], pcts, per_hour)
+            heapq.heappush(queue, (time.time() + job.get("backoff", job["interval"]), i))
+    except KeyboardInterrupt:
+        print("[watch] stopped")
+    return 0